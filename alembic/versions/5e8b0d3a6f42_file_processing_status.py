@@ -0,0 +1,45 @@
+"""file processing status
+
+Revision ID: 5e8b0d3a6f42
+Revises: d27a4e8f1c35
+Create Date: 2026-10-18 11:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5e8b0d3a6f42"
+down_revision: Union[str, Sequence[str], None] = "d27a4e8f1c35"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+processing_status = sa.Enum(
+    "PENDING", "PROCESSING", "DONE", "FAILED", name="processingstatus"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    processing_status.create(op.get_bind(), checkfirst=True)
+    # files uploaded before the pipeline existed are not queued; they keep
+    # their empty meta and count as done
+    op.add_column(
+        "files",
+        sa.Column(
+            "processing_status",
+            processing_status,
+            nullable=False,
+            server_default="DONE",
+        ),
+    )
+    op.alter_column("files", "processing_status", server_default=None)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("files", "processing_status")
+    processing_status.drop(op.get_bind(), checkfirst=True)
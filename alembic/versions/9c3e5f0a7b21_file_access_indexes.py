@@ -0,0 +1,51 @@
+"""file access indexes
+
+Revision ID: 9c3e5f0a7b21
+Revises: 4b1d7c2e9a10
+Create Date: 2026-10-18 10:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9c3e5f0a7b21"
+down_revision: Union[str, Sequence[str], None] = "4b1d7c2e9a10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # one index per arm of the USER listing predicate
+    #   visibility = 'PUBLIC'
+    #   OR (visibility = 'DEPARTMENT' AND department_id = :dept)
+    #   OR owner_id = :me
+    # each keyed on id as well so keyset pages can walk them in order
+    op.create_index(
+        "ix_files_public_id",
+        "files",
+        ["id"],
+        postgresql_where=sa.text("visibility = 'PUBLIC'"),
+    )
+    op.create_index(
+        "ix_files_department_visible_id",
+        "files",
+        ["department_id", "id"],
+        postgresql_where=sa.text("visibility = 'DEPARTMENT'"),
+    )
+    op.create_index("ix_files_owner_id_id", "files", ["owner_id", "id"])
+    op.create_index("ix_files_department_id", "files", ["department_id"])
+    op.create_index("ix_users_department_id", "users", ["department_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_users_department_id", table_name="users")
+    op.drop_index("ix_files_department_id", table_name="files")
+    op.drop_index("ix_files_owner_id_id", table_name="files")
+    op.drop_index("ix_files_department_visible_id", table_name="files")
+    op.drop_index("ix_files_public_id", table_name="files")
@@ -0,0 +1,61 @@
+"""usage counters
+
+Revision ID: a6d4e2f9c1b7
+Revises: f3c85a1e2d69
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a6d4e2f9c1b7"
+down_revision: Union[str, Sequence[str], None] = "f3c85a1e2d69"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "user_usage",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("bytes_used", sa.BigInteger(), nullable=False),
+        sa.Column("file_count", sa.Integer(), nullable=False),
+        sa.Column("download_count", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    op.create_table(
+        "department_usage",
+        sa.Column("department_id", sa.Integer(), nullable=False),
+        sa.Column("bytes_used", sa.BigInteger(), nullable=False),
+        sa.Column("file_count", sa.Integer(), nullable=False),
+        sa.Column("download_count", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["department_id"], ["departments.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("department_id"),
+    )
+    # start from the files already stored; later drift is fixed by
+    # scripts.reconcile_usage
+    for table, key, column in (
+        ("user_usage", "user_id", "owner_id"),
+        ("department_usage", "department_id", "department_id"),
+    ):
+        op.execute(
+            f"INSERT INTO {table} "
+            f"({key}, bytes_used, file_count, download_count) "
+            f"SELECT {column}, SUM(size), COUNT(*), "
+            f"SUM(COALESCE(download_count, 0)) FROM files "
+            f"WHERE {column} IS NOT NULL GROUP BY {column}"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("department_usage")
+    op.drop_table("user_usage")
@@ -0,0 +1,47 @@
+"""direct uploads
+
+Revision ID: b8f2c61d4e07
+Revises: 5e8b0d3a6f42
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b8f2c61d4e07"
+down_revision: Union[str, Sequence[str], None] = "5e8b0d3a6f42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # a new enum value cannot be used in the transaction that adds it
+    with op.get_context().autocommit_block():
+        op.execute(
+            "ALTER TYPE processingstatus ADD VALUE IF NOT EXISTS 'UPLOADING' "
+            "BEFORE 'PENDING'"
+        )
+    op.add_column(
+        "files",
+        sa.Column("upload_expires_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(
+        "ix_files_upload_expires_at",
+        "files",
+        ["upload_expires_at"],
+        postgresql_where=sa.text("processing_status = 'UPLOADING'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # postgres cannot drop an enum value; unfinished reservations go and
+    # 'UPLOADING' stays unused
+    op.execute("DELETE FROM files WHERE processing_status = 'UPLOADING'")
+    op.drop_index("ix_files_upload_expires_at", table_name="files")
+    op.drop_column("files", "upload_expires_at")
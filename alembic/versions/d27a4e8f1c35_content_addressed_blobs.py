@@ -0,0 +1,51 @@
+"""content addressed blobs
+
+Revision ID: d27a4e8f1c35
+Revises: 9c3e5f0a7b21
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d27a4e8f1c35"
+down_revision: Union[str, Sequence[str], None] = "9c3e5f0a7b21"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "blobs",
+        sa.Column("digest", sa.String(length=64), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("digest"),
+    )
+
+    op.add_column("files", sa.Column("storage_key", sa.String(), nullable=True))
+    # existing objects were stored under their filename
+    op.execute("UPDATE files SET storage_key = filename")
+    op.alter_column("files", "storage_key", nullable=False)
+
+    op.add_column(
+        "files", sa.Column("digest", sa.String(length=64), nullable=True)
+    )
+    op.create_foreign_key(
+        "files_digest_fkey", "files", "blobs", ["digest"], ["digest"]
+    )
+    op.create_index(op.f("ix_files_digest"), "files", ["digest"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_files_digest"), table_name="files")
+    op.drop_constraint("files_digest_fkey", "files", type_="foreignkey")
+    op.drop_column("files", "digest")
+    op.drop_column("files", "storage_key")
+    op.drop_table("blobs")
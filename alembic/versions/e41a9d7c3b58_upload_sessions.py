@@ -0,0 +1,36 @@
+"""upload sessions
+
+Revision ID: e41a9d7c3b58
+Revises: b8f2c61d4e07
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e41a9d7c3b58"
+down_revision: Union[str, Sequence[str], None] = "b8f2c61d4e07"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "upload_sessions",
+        sa.Column("file_id", sa.Integer(), nullable=False),
+        sa.Column("upload_id", sa.String(), nullable=False),
+        sa.Column("offset", sa.BigInteger(), nullable=False),
+        sa.Column("etags", sa.JSON(), nullable=False),
+        sa.ForeignKeyConstraint(["file_id"], ["files.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("file_id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("upload_sessions")
@@ -0,0 +1,60 @@
+"""file search indexes
+
+Revision ID: f3c85a1e2d69
+Revises: e41a9d7c3b58
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3c85a1e2d69"
+down_revision: Union[str, Sequence[str], None] = "e41a9d7c3b58"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # rewrites the table once; JSONB is what the GIN index works on
+    op.alter_column(
+        "files",
+        "meta",
+        type_=postgresql.JSONB(),
+        postgresql_using="meta::jsonb",
+    )
+    # built without blocking writes, which needs its own transactions
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_files_filename_trgm",
+            "files",
+            ["filename"],
+            postgresql_using="gin",
+            postgresql_ops={"filename": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_files_meta",
+            "files",
+            ["meta"],
+            postgresql_using="gin",
+            postgresql_ops={"meta": "jsonb_path_ops"},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_files_meta", table_name="files")
+    op.drop_index("ix_files_filename_trgm", table_name="files")
+    op.alter_column(
+        "files", "meta", type_=sa.JSON(), postgresql_using="meta::json"
+    )
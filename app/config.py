@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -7,15 +9,92 @@ class Settings(BaseSettings):
     POSTGRES_DB: str = "postgres"
     POSTGRES_HOST: str = "db"
     POSTGRES_PORT: str = "5432"
+    # full SQLAlchemy URL, overrides the POSTGRES_* parts when set
+    # (e.g. sqlite+aiosqlite:///./bench.db for local benchmarks)
+    DB_URL: str = ""
+
+    # read-only routes are spread over these (a JSON list of URLs like
+    # DB_URL); empty sends every query to the primary
+    DB_REPLICA_URLS: list[str] = []
+    DB_REPLICA_CHECK_INTERVAL: float = 5.0
+    DB_REPLICA_MAX_LAG: float = 10.0
+    DB_REPLICA_CONNECT_TIMEOUT: float = 2.0
+    # a caller's reads go to the primary for this long after they write
+    READ_YOUR_WRITES_WINDOW: float = 5.0
+    # writers each worker remembers; past that the oldest are forgotten
+    # before the window ends, unless READ_YOUR_WRITES_REDIS has them
+    READ_YOUR_WRITES_SIZE: int = 10_000
+    READ_YOUR_WRITES_REDIS: bool = False
+
+    SQL_ECHO: bool = False
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True
+    LOG_SAMPLE_RATE: float = 1.0
 
     REDIS_URL: str = "redis://redis:6379/0"
+    REDIS_POOL_SIZE: int = 32
+    REDIS_TIMEOUT: float = 0.5
+
+    # "minio" (S3 API, clients download via presigned URLs) or "local"
+    # (files under LOCAL_STORAGE_ROOT, served by /files/{id}/content)
+    STORAGE_BACKEND: Literal["minio", "local"] = "minio"
+    LOCAL_STORAGE_ROOT: str = "./storage"
     S3_ENDPOINT: str = "http://minio:9000"
     S3_ACCESS_KEY: str = "minioadmin"
     S3_SECRET_KEY: str = "minioadmin"
+    S3_BUCKET: str = "files"
+    UPLOAD_PART_SIZE: int = 8 * 1024 * 1024
+    BATCH_MAX_FILES: int = 500
+    # bytes explode_zip may unpack per batch, also held to the quota left
+    BATCH_MAX_UNZIPPED_BYTES: int = 2 * 1024 * 1024 * 1024
+    BATCH_PARALLELISM: int = 8
+    S3_POOL_SIZE: int = 16
+    S3_MAX_WORKERS: int = 16
+    PRESIGNED_URL_EXPIRE: int = 3600
+    PRESIGNED_URL_CACHE_TTL: int = 600
+    PRESIGNED_URL_CACHE_SIZE: int = 10_000
+    PRESIGNED_URL_CACHE_REDIS: bool = False
+    # direct-to-storage uploads: how long a reservation's POST policy is
+    # valid, and how often unfinished reservations are reaped
+    DIRECT_UPLOAD_EXPIRE: int = 900
+    UPLOAD_REAP_INTERVAL: float = 300.0
+    # total bytes a user / a department may store, 0 for no limit
+    USER_QUOTA_BYTES: int = 5 * 1024**3
+    DEPARTMENT_QUOTA_BYTES: int = 50 * 1024**3
     JWT_SECRET: str = "supersecret"
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    BCRYPT_ROUNDS: int = 12
+    HASH_WORKERS: int = 2
+    HASH_QUEUE_SIZE: int = 32
+    HASH_BULK_CHUNK: int = 16
+    IMPORT_BATCH_SIZE: int = 500
+
+    PAGE_SIZE_DEFAULT: int = 100
+    PAGE_SIZE_MAX: int = 1000
+    STREAM_BATCH_SIZE: int = 1000
+
+    PRINCIPAL_CACHE_TTL: int = 30
+    PRINCIPAL_CACHE_SIZE: int = 10_000
+    PRINCIPAL_CACHE_REDIS: bool = False
+
+    CELERY_BROKER_URL: str = ""
+    CELERY_EAGER: bool = False
+    METADATA_WORKERS: int = 2
+    METADATA_MAX_RETRIES: int = 5
+    METADATA_SNIPPET_CHARS: int = 500
+
+    # per-caller token buckets, budgets in app/services/ratelimit.py
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_REDIS: bool = False
+    RATE_LIMIT_LOCAL_SIZE: int = 100_000
+    # requests a worker runs at once before it answers 503, 0 for no limit
+    MAX_IN_FLIGHT: int = 256
+
+    DOWNLOAD_FLUSH_INTERVAL: float = 5.0
+    DOWNLOAD_COUNTER_REDIS: bool = False
+
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -23,6 +102,8 @@ class Settings(BaseSettings):
     @property
     def DATABASE_URL(self) -> str:
         """Build async DB URL dynamically from env vars"""
+        if self.DB_URL:
+            return self.DB_URL
         return (
             f"postgresql+asyncpg://{self.POSTGRES_USER}:"
             f"{self.POSTGRES_PASSWORD}"
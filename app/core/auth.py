@@ -5,19 +5,18 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
-from app.db import get_db
+from app.db import read_session
 from app.models import User
+from app.services.principals import Principal, principal_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
-    db: Annotated[AsyncSession, Depends(get_db)],
-) -> User:
+) -> Principal:
     cred_exc = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
     )
@@ -31,11 +30,23 @@ async def get_current_user(
     except JWTError:
         raise cred_exc
 
-    q = await db.execute(select(User).where(User.username == sub))
-    user = q.scalar_one_or_none()
-    if not user:
+    principal = await principal_cache.get(sub)
+    if principal is not None:
+        return principal
+
+    # a short read session of its own, only on a cache miss
+    async with read_session(sub) as db:
+        q = await db.execute(
+            select(User.id, User.username, User.role, User.department_id).where(
+                User.username == sub
+            )
+        )
+        row = q.one_or_none()
+    if not row:
         raise cred_exc
-    return user
+    principal = Principal(*row)
+    await principal_cache.set(principal)
+    return principal
 
 
 Role = Literal["USER", "MANAGER", "ADMIN"]
@@ -43,8 +54,8 @@ Role = Literal["USER", "MANAGER", "ADMIN"]
 
 def require_roles(*allowed: str) -> Callable:
     async def _checker(
-        current: Annotated[User, Depends(get_current_user)],
-    ) -> User:
+        current: Annotated[Principal, Depends(get_current_user)],
+    ) -> Principal:
         user_role = (
             current.role.value
             if isinstance(current.role, enum.Enum)
@@ -0,0 +1,169 @@
+"""Prometheus metrics.
+
+With several workers, point PROMETHEUS_MULTIPROC_DIR at an empty shared
+directory before start-up; every worker then writes its samples there and
+/metrics aggregates them, whichever worker serves the scrape.
+"""
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template",
+    ["method", "route"],
+)
+REQUESTS = Counter(
+    "http_requests_total",
+    "Requests by route template and status code",
+    ["method", "route", "status"],
+)
+REQUESTS_REJECTED = Counter(
+    "http_requests_rejected_total",
+    "Requests turned away before routing, by reason",
+    ["reason"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests being handled",
+    multiprocess_mode="livesum",
+)
+DB_STATEMENT_LATENCY = Histogram(
+    "db_statement_duration_seconds",
+    "SQL statement execution time",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+DB_STATEMENTS_PER_REQUEST = Histogram(
+    "db_statements_per_request",
+    "SQL statements executed per request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds",
+    "Total SQL time spent per request",
+    ["route"],
+)
+DB_SESSIONS = Counter(
+    "db_sessions_total",
+    "Request sessions by database (primary, replicaN) and why it was chosen",
+    ["target", "reason"],
+)
+DB_REPLICA_FAILOVERS = Counter(
+    "db_replica_failovers_total",
+    "Read sessions that could not connect to a replica and moved on",
+    ["replica"],
+)
+DB_REPLICA_HEALTHY = Gauge(
+    "db_replica_healthy",
+    "1 while a replica is answering within the allowed lag",
+    ["replica"],
+    multiprocess_mode="livemin",
+)
+STORAGE_LATENCY = Histogram(
+    "storage_call_duration_seconds",
+    "Object storage call duration",
+    ["op"],
+)
+HASH_QUEUE_WAIT = Histogram(
+    "password_hash_queue_wait_seconds",
+    "Time a password hash job waited for a worker slot",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Connections open beyond pool_size",
+    multiprocess_mode="livesum",
+)
+STORAGE_QUEUED = Gauge(
+    "storage_queued_calls",
+    "Storage calls waiting for an executor thread",
+    multiprocess_mode="livesum",
+)
+HASH_PENDING = Gauge(
+    "password_hash_pending",
+    "Password hash jobs running or waiting",
+    multiprocess_mode="livesum",
+)
+
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    db_time: float = 0.0
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def start_request() -> RequestStats:
+    stats = RequestStats()
+    _request_stats.set(stats)
+    return stats
+
+
+def observe_request(
+    method: str, route: str, status: int, elapsed: float, stats: RequestStats
+):
+    REQUEST_LATENCY.labels(method, route).observe(elapsed)
+    REQUESTS.labels(method, route, str(status)).inc()
+    DB_STATEMENTS_PER_REQUEST.labels(route).observe(stats.statements)
+    DB_TIME_PER_REQUEST.labels(route).observe(stats.db_time)
+
+
+def instrument_engine(engine: AsyncEngine):
+    """Time every statement and charge it to the current request.
+
+    SQLAlchemy runs these sync hooks in a greenlet that shares the
+    caller's contextvars, so the request's RequestStats is visible.
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        DB_STATEMENT_LATENCY.observe(elapsed)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_time += elapsed
+
+
+def render(engine: AsyncEngine, storage_stats: dict, hash_stats: dict) -> bytes:
+    # gauges are sampled by whichever worker serves the scrape; in
+    # multiprocess mode each worker's last sample is summed
+    pool = engine.sync_engine.pool
+    DB_POOL_CHECKED_OUT.set(pool.checkedout())
+    DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+    STORAGE_QUEUED.set(storage_stats["queued"])
+    HASH_PENDING.set(hash_stats["pending"])
+
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
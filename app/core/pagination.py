@@ -0,0 +1,75 @@
+from dataclasses import dataclass
+from typing import Literal
+
+import orjson
+from fastapi import Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+from app.config import settings
+from app.db import async_session_maker
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass
+class PageParams:
+    cursor: int | None
+    limit: int
+    stream: bool
+
+
+def page_params(
+    cursor: int | None = Query(
+        None, ge=0, description="Return rows with id greater than this"
+    ),
+    limit: int = Query(
+        settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX
+    ),
+    format: Literal["json", "ndjson"] = Query(
+        "json", description="ndjson streams every matching row"
+    ),
+) -> PageParams:
+    return PageParams(cursor=cursor, limit=limit, stream=format == "ndjson")
+
+
+def keyset(stmt: Select, key: InstrumentedAttribute, page: PageParams) -> Select:
+    """Order by `key` and start after the cursor. Fetches one extra row so
+    `finish_page` can tell whether another page exists."""
+    if page.cursor is not None:
+        stmt = stmt.where(key > page.cursor)
+    stmt = stmt.order_by(key)
+    if not page.stream:
+        stmt = stmt.limit(page.limit + 1)
+    return stmt
+
+
+def finish_page(rows: list, page: PageParams, response: Response) -> list:
+    if len(rows) > page.limit:
+        rows = rows[: page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = str(rows[-1].id)
+    return rows
+
+
+def ndjson_response(stmt: Select, db: AsyncSession) -> StreamingResponse:
+    """Stream the rows of a column SELECT as NDJSON from a server-side
+    cursor.
+
+    Uses its own session on the database `db` is bound to (a replica for
+    read routes), so it lives as long as the response body, and only
+    STREAM_BATCH_SIZE rows are buffered at a time.
+    """
+
+    async def rows():
+        async with async_session_maker(bind=db.bind) as session:
+            result = await session.stream(
+                stmt.execution_options(yield_per=settings.STREAM_BATCH_SIZE)
+            )
+            async for partition in result.mappings().partitions():
+                yield b"".join(
+                    orjson.dumps(dict(row)) + b"\n" for row in partition
+                )
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
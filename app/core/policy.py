@@ -0,0 +1,75 @@
+"""File access rules, in Python and as SQL predicates.
+
+Every rule exists twice: a `can_*` function for a row already in hand and
+a `*_clause` that puts the same rule in a WHERE clause, so point lookups
+and listings check access in the query itself. Keep each pair in step;
+tests/test_policy.py compares them over every combination of role,
+department and visibility.
+
+    ADMIN    sees and deletes everything
+    owner    sees and deletes their own files
+    PUBLIC   visible to everyone
+    DEPARTMENT
+             visible to members of the file's department, and to every
+             MANAGER who belongs to some department
+    MANAGER  also deletes any file of their own department
+"""
+from sqlalchemy import ColumnElement, and_, or_, true
+
+from app.models import File, Visibility
+from app.services.principals import Principal
+
+
+def can_create_visibility(role: str, vis: str) -> bool:
+    if role == "USER":
+        return vis == Visibility.PRIVATE
+    return True
+
+
+def can_view(user: Principal, f: File) -> bool:
+    if user.role == "ADMIN":
+        return True
+    if f.owner_id == user.id or f.visibility == Visibility.PUBLIC:
+        return True
+    if f.visibility != Visibility.DEPARTMENT or user.department_id is None:
+        return False
+    return user.role == "MANAGER" or f.department_id == user.department_id
+
+
+def view_clause(user: Principal) -> ColumnElement[bool]:
+    """can_view as a predicate on File. Each arm is served by its own
+    index (see the file_access_indexes migration)."""
+    if user.role == "ADMIN":
+        return true()
+    arms = [File.visibility == Visibility.PUBLIC, File.owner_id == user.id]
+    if user.department_id is not None:
+        if user.role == "MANAGER":
+            arms.append(File.visibility == Visibility.DEPARTMENT)
+        else:
+            arms.append(
+                and_(
+                    File.visibility == Visibility.DEPARTMENT,
+                    File.department_id == user.department_id,
+                )
+            )
+    return or_(*arms)
+
+
+def can_delete(user: Principal, f: File) -> bool:
+    if user.role == "ADMIN" or f.owner_id == user.id:
+        return True
+    return (
+        user.role == "MANAGER"
+        and user.department_id is not None
+        and f.department_id == user.department_id
+    )
+
+
+def delete_clause(user: Principal) -> ColumnElement[bool]:
+    """can_delete as a predicate on File."""
+    if user.role == "ADMIN":
+        return true()
+    owner = File.owner_id == user.id
+    if user.role == "MANAGER" and user.department_id is not None:
+        return or_(owner, File.department_id == user.department_id)
+    return owner
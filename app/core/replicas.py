@@ -0,0 +1,150 @@
+import asyncio
+import itertools
+import logging
+
+from redis.exceptions import RedisError
+from sqlalchemy import make_url, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.config import settings
+from app.core.metrics import DB_REPLICA_HEALTHY, instrument_engine
+from app.services.cache import TTLCache
+from app.services.redis import get_redis
+
+logger = logging.getLogger("app")
+
+# what connecting to an unreachable or broken database raises
+CONNECT_ERRORS = (DBAPIError, OSError, TimeoutError)
+
+# seconds behind the primary; 0 when everything received is replayed, as
+# an idle primary leaves the last replay timestamp arbitrarily old
+PG_LAG = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+    "THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) "
+    "END"
+)
+
+STICKY_PREFIX = "wrote:"
+
+
+class ReplicaSet:
+    """Engines for the read replicas and which of them are usable.
+
+    `run` probes every replica in the background and marks it down while
+    it does not answer or lags more than `max_lag` seconds; a request that
+    cannot connect to one marks it down at once (see app.db).
+    """
+
+    def __init__(self, urls: list[str], max_lag: float, connect_timeout: float):
+        self.max_lag = max_lag
+        self.connect_timeout = connect_timeout
+        self.engines: list[AsyncEngine] = []
+        for url in urls:
+            connect_args = {}
+            if make_url(url).get_backend_name() == "postgresql":
+                connect_args["timeout"] = connect_timeout
+            # a pooled connection to a replica that went away fails the
+            # checkout, where app.db can still move on to another one
+            engine = create_async_engine(
+                url,
+                echo=settings.SQL_ECHO,
+                pool_pre_ping=True,
+                connect_args=connect_args,
+            )
+            instrument_engine(engine)
+            self.engines.append(engine)
+        self.healthy = [True] * len(self.engines)
+        self._turn = itertools.count()
+        for i in range(len(self.engines)):
+            DB_REPLICA_HEALTHY.labels(str(i)).set(1)
+
+    def candidates(self) -> list[int]:
+        """Healthy replicas, from the next one in round-robin order."""
+        n = len(self.engines)
+        if not n:
+            return []
+        start = next(self._turn) % n
+        order = ((start + k) % n for k in range(n))
+        return [i for i in order if self.healthy[i]]
+
+    def mark(self, i: int, healthy: bool):
+        if self.healthy[i] != healthy:
+            logger.warning("Replica %d is %s", i, "up" if healthy else "down")
+        self.healthy[i] = healthy
+        DB_REPLICA_HEALTHY.labels(str(i)).set(int(healthy))
+
+    async def _probe(self, engine: AsyncEngine) -> bool:
+        try:
+            async with asyncio.timeout(self.connect_timeout):
+                async with engine.connect() as conn:
+                    if conn.dialect.name == "postgresql":
+                        lag = await conn.scalar(PG_LAG)
+                    else:
+                        lag = await conn.scalar(text("SELECT 0"))
+        except CONNECT_ERRORS:
+            return False
+        return not self.max_lag or float(lag or 0) <= self.max_lag
+
+    async def check(self):
+        results = await asyncio.gather(*(self._probe(e) for e in self.engines))
+        for i, healthy in enumerate(results):
+            self.mark(i, healthy)
+
+    async def run(self, interval: float):
+        while True:
+            await self.check()
+            await asyncio.sleep(interval)
+
+    async def dispose(self):
+        for engine in self.engines:
+            await engine.dispose()
+
+    def stats(self) -> dict:
+        return {"replicas": len(self.engines), "healthy": sum(self.healthy)}
+
+
+class RecentWriters:
+    """JWT subjects that wrote in the last `window` seconds.
+
+    Their reads go to the primary so they see their own writes whatever
+    the replicas' lag. Kept per worker, and in Redis with `use_redis` so
+    the next request may land on any worker.
+    """
+
+    def __init__(self, window: float, max_size: int, use_redis: bool):
+        self.window = window
+        self.use_redis = use_redis
+        self._local: TTLCache[bool] = TTLCache(window, max_size)
+
+    async def add(self, sub: str):
+        self._local.set(sub, True)
+        if self.use_redis:
+            try:
+                await get_redis().set(
+                    STICKY_PREFIX + sub, 1, px=int(self.window * 1000)
+                )
+            except RedisError:
+                pass
+
+    async def wrote_recently(self, sub: str) -> bool:
+        if self._local.get(sub):
+            return True
+        if self.use_redis:
+            try:
+                return bool(await get_redis().exists(STICKY_PREFIX + sub))
+            except RedisError:
+                pass
+        return False
+
+
+replicas = ReplicaSet(
+    settings.DB_REPLICA_URLS,
+    settings.DB_REPLICA_MAX_LAG,
+    settings.DB_REPLICA_CONNECT_TIMEOUT,
+)
+recent_writers = RecentWriters(
+    settings.READ_YOUR_WRITES_WINDOW,
+    settings.READ_YOUR_WRITES_SIZE,
+    settings.READ_YOUR_WRITES_REDIS,
+)
@@ -0,0 +1,179 @@
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import quote
+
+import anyio
+import orjson
+from fastapi import Request, Response
+from starlette.types import Receive, Scope, Send
+
+CHUNK_SIZE = 256 * 1024
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+class ORJSONResponse(Response):
+    """JSON encoded with orjson.
+
+    For plain rows already shaped like the route's response_model: an
+    endpoint that returns a Response skips FastAPI's validation and
+    serialisation, so the model only documents the schema.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+class FileRangeResponse(Response):
+    """Send bytes [start, start + length) of a file.
+
+    Uses the ASGI zero-copy extension (sendfile) when the server offers
+    it; otherwise reads chunks with pread in a worker thread, so only one
+    chunk is in memory at a time.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        start: int,
+        length: int,
+        status_code: int,
+        headers: dict[str, str],
+        media_type: str,
+    ):
+        super().__init__(
+            status_code=status_code, headers=headers, media_type=media_type
+        )
+        self.path = path
+        self.start = start
+        self.length = length
+        self.headers["content-length"] = str(length)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        fd = await anyio.to_thread.run_sync(os.open, self.path, os.O_RDONLY)
+        try:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": self.status_code,
+                    "headers": self.raw_headers,
+                }
+            )
+            if scope["method"] == "HEAD":
+                await send({"type": "http.response.body", "body": b""})
+            elif ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+                await send(
+                    {
+                        "type": ZEROCOPY_EXTENSION,
+                        "file": fd,
+                        "offset": self.start,
+                        "count": self.length,
+                    }
+                )
+            else:
+                await self._send_chunks(fd, send)
+        finally:
+            os.close(fd)
+
+    async def _send_chunks(self, fd: int, send: Send):
+        offset, remaining = self.start, self.length
+        while remaining > 0:
+            chunk = await anyio.to_thread.run_sync(
+                os.pread, fd, min(CHUNK_SIZE, remaining), offset
+            )
+            if not chunk:
+                break
+            offset += len(chunk)
+            remaining -= len(chunk)
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                }
+            )
+        if remaining > 0:
+            # file shrank underneath us; end the body
+            await send({"type": "http.response.body", "body": b""})
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
+    return False
+
+
+def _byte_range(header: str, size: int) -> tuple[int, int] | None:
+    """(start, length) of a single `bytes=` range; None if unsatisfiable.
+    Multi-range requests are answered with the first range only."""
+    m = _RANGE.match(header.split(",")[0].strip())
+    if not m or not (m.group(1) or m.group(2)):
+        return None
+    first, last = m.group(1), m.group(2)
+    if not first:
+        # suffix range: the last N bytes
+        length = min(int(last), size)
+        return (size - length, length) if length else None
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return None
+    return start, end - start + 1
+
+
+def file_response(
+    request: Request,
+    path: str,
+    media_type: str,
+    filename: str | None = None,
+    etag: str | None = None,
+) -> Response:
+    """Serve a local file with ETag, Last-Modified and Range handling.
+
+    `etag` defaults to one derived from size and mtime; pass a content
+    hash for a strong validator that survives re-uploads.
+    """
+    st = os.stat(path)
+    etag = f'"{etag}"' if etag else f'"{st.st_size:x}-{int(st.st_mtime):x}"'
+    headers = {
+        "accept-ranges": "bytes",
+        "etag": etag,
+        "last-modified": formatdate(st.st_mtime, usegmt=True),
+    }
+    if filename:
+        headers["content-disposition"] = (
+            f"attachment; filename*=UTF-8''{quote(filename)}"
+        )
+
+    if _not_modified(request, etag, st.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == etag):
+        byte_range = _byte_range(range_header, st.st_size)
+        if byte_range is None:
+            return Response(
+                status_code=416,
+                headers={"content-range": f"bytes */{st.st_size}"},
+            )
+        start, length = byte_range
+        headers["content-range"] = (
+            f"bytes {start}-{start + length - 1}/{st.st_size}"
+        )
+        return FileRangeResponse(path, start, length, 206, headers, media_type)
+
+    return FileRangeResponse(path, 0, st.st_size, 200, headers, media_type)
@@ -0,0 +1,20 @@
+from jose import JWTError, jwt
+
+from app.config import settings
+
+
+def bearer_claims(authorization: str | None) -> dict:
+    """Claims of a valid `Bearer <jwt>` Authorization header, else {}.
+
+    For code that only needs to know who is calling, before or outside
+    get_current_user (rate limiting, replica routing).
+    """
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return {}
+    try:
+        return jwt.decode(
+            token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
+        )
+    except JWTError:
+        return {}
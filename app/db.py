@@ -1,11 +1,20 @@
 import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
+from fastapi import Request
+from pydantic import BaseModel
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 from app.config import settings
+from app.core.metrics import DB_REPLICA_FAILOVERS, DB_SESSIONS, instrument_engine
+from app.core.replicas import CONNECT_ERRORS, recent_writers, replicas
+from app.core.tokens import bearer_claims
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+engine = create_async_engine(settings.DATABASE_URL, echo=settings.SQL_ECHO)
+instrument_engine(engine)
 
 
 DATABASE_URL = os.getenv(
@@ -21,6 +30,84 @@ async_session_maker = sessionmaker(
 Base = declarative_base()
 
 
-async def get_db():
-    async with async_session_maker() as session:
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+async def get_db(request: Request):
+    """Session on the primary, for routes that write.
+
+    With replicas, the caller's reads stick to the primary for
+    READ_YOUR_WRITES_WINDOW seconds after a write request finishes.
+    """
+    sub = None
+    if replicas.engines:
+        DB_SESSIONS.labels("primary", "write").inc()
+        if request.method not in SAFE_METHODS:
+            sub = bearer_claims(request.headers.get("authorization")).get("sub")
+    if sub:
+        # also during the request, for a route that commits part way
+        await recent_writers.add(sub)
+    try:
+        async with async_session_maker() as session:
+            yield session
+    finally:
+        # counted from the commit, however long the write took
+        if sub:
+            await recent_writers.add(sub)
+
+
+async def _open_read_session(sub: str | None) -> AsyncSession:
+    if not replicas.engines:
+        return async_session_maker()
+    if sub is not None and await recent_writers.wrote_recently(sub):
+        DB_SESSIONS.labels("primary", "sticky").inc()
+        return async_session_maker()
+    for i in replicas.candidates():
+        session = async_session_maker(bind=replicas.engines[i])
+        try:
+            await session.connection()
+        except CONNECT_ERRORS:
+            await session.close()
+            replicas.mark(i, False)
+            DB_REPLICA_FAILOVERS.labels(str(i)).inc()
+            continue
+        DB_SESSIONS.labels(f"replica{i}", "round_robin").inc()
+        return session
+    DB_SESSIONS.labels("primary", "no_replica").inc()
+    return async_session_maker()
+
+
+@asynccontextmanager
+async def read_session(sub: str | None) -> AsyncIterator[AsyncSession]:
+    """Session for reads: on the next healthy replica, or on the primary
+    without one or while `sub` (a JWT subject) has recent writes.
+
+    Connects before it is handed out, so a replica that cannot be
+    reached is marked down and the next one, finally the primary, is
+    used instead of failing the request.
+    """
+    session = await _open_read_session(sub)
+    async with session:
         yield session
+
+
+async def get_read_db(request: Request):
+    """get_db for routes that only read; may be served by a replica."""
+    sub = None
+    if replicas.engines:
+        sub = bearer_claims(request.headers.get("authorization")).get("sub")
+    async with read_session(sub) as session:
+        yield session
+
+
+def upsert(session: AsyncSession, model):
+    """INSERT with on_conflict_do_* for the session's dialect."""
+    if session.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
+
+
+def columns_for(model, schema: type[BaseModel]) -> list:
+    """The columns of `model` that `schema` reads, for SELECTs that return
+    response rows without loading ORM objects."""
+    return [getattr(model, name) for name in schema.model_fields]
@@ -1,10 +1,53 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.config import settings
+from app.core import metrics
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.replicas import replicas
+from app.db import engine
 from app.middleware import init_middleware
-from app.routers import auth, departments, files, users
+from app.routers import auth, departments, files, usage, users
+from app.services.counters import download_counter
+from app.services.hashing import hasher
+from app.services.principals import principal_cache
+from app.services.ratelimit import rate_limiter
+from app.services.redis import close_redis
+from app.services.storage import storage
+from app.services.uploads import run_reaper
+from app.services.url_cache import url_cache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await storage.ensure_bucket()
+    tasks = [
+        asyncio.create_task(download_counter.run()),
+        asyncio.create_task(run_reaper(storage, settings.UPLOAD_REAP_INTERVAL)),
+    ]
+    if principal_cache.use_redis:
+        tasks.append(asyncio.create_task(principal_cache.listen()))
+    if replicas.engines:
+        tasks.append(
+            asyncio.create_task(replicas.run(settings.DB_REPLICA_CHECK_INTERVAL))
+        )
+    yield
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    # counts still pending in memory would be lost with the process
+    await download_counter.flush()
+    await close_redis()
+    await replicas.dispose()
+    hasher.close()
+    storage.close()
+
 
-app = FastAPI(title="File Management API")
+app = FastAPI(title="File Management API", lifespan=lifespan)
 
 
 init_middleware(app)
@@ -16,6 +59,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 
@@ -23,8 +67,28 @@ app.include_router(auth.router, prefix="/auth", tags=["Auth"])
 app.include_router(users.router)
 app.include_router(departments.router)
 app.include_router(files.router)
+app.include_router(usage.router)
 
 
 @app.get("/")
 async def root():
     return {"message": "API is working 🚀"}
+
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "storage": storage.stats(),
+        "hasher": hasher.stats(),
+        "principal_cache": principal_cache.stats(),
+        "url_cache": url_cache.stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "replicas": replicas.stats(),
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    body = metrics.render(engine, storage.stats(), hasher.stats())
+    return Response(body, media_type=metrics.CONTENT_TYPE_LATEST)
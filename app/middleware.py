@@ -1,37 +1,236 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import random
 import time
 
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.core.metrics import (
+    REQUESTS_IN_FLIGHT,
+    REQUESTS_REJECTED,
+    observe_request,
+    start_request,
+)
+from app.core.tokens import bearer_claims
+from app.services.ratelimit import (
+    ANONYMOUS,
+    RateLimiter,
+    rate_limiter,
+    retry_after,
+)
 
 logger = logging.getLogger("app")
-logging.basicConfig(level=logging.INFO)
 
+ERROR_BODY = json.dumps({"error": "Internal server error"}).encode()
+# probes must get through however busy the worker is
+ADMISSION_EXEMPT = {"/health", "/metrics"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra={"fields": {...}}` is merged in."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
 
-async def log_requests(request: Request, call_next):
-    """Log every request and response time."""
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = (time.time() - start_time) * 1000
 
-    logger.info(
-        f"{request.method} {request.url.path} "
-        f"status={response.status_code} "
-        f"time={process_time:.2f}ms"
+def init_logging():
+    """Send log records through a queue to a background writer thread, so
+    the event loop never blocks on log I/O."""
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    if settings.LOG_JSON:
+        handler.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(
+        records, handler, respect_handler_level=True
     )
-    return response
+
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(records)]
+    root.setLevel(settings.LOG_LEVEL)
+    listener.start()
+    atexit.register(listener.stop)
+
+
+class RequestLogMiddleware:
+    """Request timing, metrics, sampled access log and the last-resort 500.
+
+    Plain ASGI: no extra task per request and response bodies, streaming
+    ones included, pass through untouched. Errors and 5xx are always
+    logged; other requests with probability `sample_rate`.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: float = 1.0):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = start_request()
+        start = time.perf_counter()
+        status = 500
+        started = False
+
+        async def send_wrapper(message: Message):
+            nonlocal status, started
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            logger.error(
+                "Unhandled error on %s: %s",
+                scope["path"],
+                exc,
+                exc_info=exc,
+                extra={"fields": {"path": scope["path"]}},
+            )
+            if started:
+                raise
+            status = 500
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 500,
+                    "headers": [(b"content-type", b"application/json")],
+                }
+            )
+            await send({"type": "http.response.body", "body": ERROR_BODY})
+        finally:
+            elapsed = time.perf_counter() - start
+            route_path = route_label(scope)
+            observe_request(scope["method"], route_path, status, elapsed, stats)
+            if status >= 500 or random.random() < self.sample_rate:
+                logger.info(
+                    "%s %s status=%d time=%.2fms",
+                    scope["method"],
+                    scope["path"],
+                    status,
+                    elapsed * 1000,
+                    extra={
+                        "fields": {
+                            "method": scope["method"],
+                            "path": scope["path"],
+                            "route": route_path,
+                            "status": status,
+                            "ms": round(elapsed * 1000, 2),
+                            "sql": stats.statements,
+                        }
+                    },
+                )
 
 
-async def global_exception_handler(request: Request, exc: Exception):
-    """Return clean JSON errors instead of raw HTML/tracebacks."""
-    logger.error(f"Unhandled error on {request.url.path}: {exc}")
-    return JSONResponse(
-        status_code=500,
-        content={"error": "Internal server error"},
+def route_label(scope: Scope) -> str:
+    """Full path template of the matched route, e.g. /auth/me.
+
+    route.path leaves out the prefix the router was included with; it is
+    the part of the request path before the segments the template covers.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    path = scope["path"].removeprefix(scope.get("root_path", ""))
+    prefix = path.rsplit("/", route.path.count("/"))[0]
+    return prefix + route.path
+
+
+def caller(scope: Scope) -> tuple[str, str]:
+    """Rate limit identity and role: the JWT `sub` and `role` claims of a
+    valid bearer token, otherwise the client address."""
+    claims = bearer_claims(Headers(scope=scope).get("authorization"))
+    if claims.get("sub"):
+        return f"user:{claims['sub']}", claims.get("role", "USER")
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}", ANONYMOUS
+
+
+async def reject(send: Send, status: int, detail: str, wait: str):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"retry-after", wait.encode()),
+            ],
+        }
     )
+    body = json.dumps({"detail": detail}).encode()
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """Turns requests away before routing, with Retry-After.
+
+    Past `max_in_flight` requests running in this worker, new ones get a
+    503 straight away rather than queueing behind the others. Then the
+    caller's token buckets are checked (see app/services/ratelimit.py)
+    and an empty one is a 429.
+    """
+
+    def __init__(
+        self, app: ASGIApp, limiter: RateLimiter | None, max_in_flight: int
+    ):
+        self.app = app
+        self.limiter = limiter
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in ADMISSION_EXEMPT:
+            await self.app(scope, receive, send)
+            return
+
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            REQUESTS_REJECTED.labels("overloaded").inc()
+            await reject(send, 503, "Server is busy", "1")
+            return
+
+        self.in_flight += 1
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            if self.limiter is not None:
+                identity, role = caller(scope)
+                route = f"{scope['method']} {scope['path']}"
+                wait = await self.limiter.take(identity, route, role)
+                if wait:
+                    REQUESTS_REJECTED.labels("rate_limited").inc()
+                    await reject(send, 429, "Too many requests", retry_after(wait))
+                    return
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            REQUESTS_IN_FLIGHT.dec()
 
 
 def init_middleware(app: FastAPI):
-    """Attach all middleware and exception handlers to app."""
-    app.middleware("http")(log_requests)
-    app.add_exception_handler(Exception, global_exception_handler)
+    """Attach all middleware to app."""
+    init_logging()
+    # added first, so it runs inside the request log and rejections are
+    # logged and counted like any other response
+    app.add_middleware(
+        AdmissionMiddleware,
+        limiter=rate_limiter if settings.RATE_LIMIT_ENABLED else None,
+        max_in_flight=settings.MAX_IN_FLIGHT,
+    )
+    app.add_middleware(RequestLogMiddleware, sample_rate=settings.LOG_SAMPLE_RATE)
@@ -1,3 +1,6 @@
+from .blob import Blob  # noqa: F401
 from .department import Department  # noqa: F401
-from .file import File, Visibility  # noqa: F401
+from .file import File, ProcessingStatus, Visibility  # noqa: F401
 from .user import Role, User  # noqa: F401
+from .upload_session import UploadSession  # noqa: F401
+from .usage import DepartmentUsage, UserUsage  # noqa: F401
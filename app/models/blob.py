@@ -0,0 +1,16 @@
+from sqlalchemy import BigInteger, Column, Integer, String
+from sqlalchemy.orm import relationship
+
+from app.db import Base
+
+
+class Blob(Base):
+    """Stored object content, shared by every File with the same digest."""
+
+    __tablename__ = "blobs"
+
+    digest = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=1)
+
+    files = relationship("File", back_populates="blob")
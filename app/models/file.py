@@ -1,22 +1,46 @@
 import enum
 
-from sqlalchemy import JSON, Column, Enum, ForeignKey, Integer, String
+from sqlalchemy import (
+    JSON,
+    Column,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    text,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 
 from app.db import Base
 
 
-class Visibility(enum.Enum):
+class Visibility(str, enum.Enum):
     PRIVATE = "PRIVATE"
     DEPARTMENT = "DEPARTMENT"
     PUBLIC = "PUBLIC"
 
 
+class ProcessingStatus(str, enum.Enum):
+    # reserved for a direct upload that has not been completed yet
+    UPLOADING = "UPLOADING"
+    PENDING = "PENDING"
+    PROCESSING = "PROCESSING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+
+
 class File(Base):
     __tablename__ = "files"
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, nullable=False)
+    storage_key = Column(String, nullable=False)
+    digest = Column(
+        String(64), ForeignKey("blobs.digest"), nullable=True, index=True
+    )
     size = Column(Integer, nullable=False)
     mime_type = Column(String, nullable=False)
     visibility = Column(
@@ -25,11 +49,57 @@ class File(Base):
 
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     department_id = Column(
-        Integer, ForeignKey("departments.id"), nullable=True
+        Integer, ForeignKey("departments.id"), nullable=True, index=True
     )
 
-    meta = Column(JSON, nullable=True)
+    meta = Column(JSON().with_variant(JSONB, "postgresql"), nullable=True)
+    processing_status = Column(
+        Enum(ProcessingStatus),
+        default=ProcessingStatus.PENDING,
+        nullable=False,
+    )
     download_count = Column(Integer, default=0)
+    # set while UPLOADING: the reaper drops the reservation after this
+    upload_expires_at = Column(DateTime(timezone=True), nullable=True)
 
     owner = relationship("User", back_populates="files")
     department = relationship("Department", back_populates="files")
+    blob = relationship("Blob", back_populates="files")
+
+    # access paths of the USER listing predicate, see the
+    # file_access_indexes migration
+    __table_args__ = (
+        Index(
+            "ix_files_public_id",
+            "id",
+            postgresql_where=text("visibility = 'PUBLIC'"),
+            sqlite_where=text("visibility = 'PUBLIC'"),
+        ),
+        Index(
+            "ix_files_department_visible_id",
+            "department_id",
+            "id",
+            postgresql_where=text("visibility = 'DEPARTMENT'"),
+            sqlite_where=text("visibility = 'DEPARTMENT'"),
+        ),
+        Index("ix_files_owner_id_id", "owner_id", "id"),
+        # /files/search, see the file_search_indexes migration
+        Index(
+            "ix_files_filename_trgm",
+            "filename",
+            postgresql_using="gin",
+            postgresql_ops={"filename": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_files_meta",
+            "meta",
+            postgresql_using="gin",
+            postgresql_ops={"meta": "jsonb_path_ops"},
+        ),
+        Index(
+            "ix_files_upload_expires_at",
+            "upload_expires_at",
+            postgresql_where=text("processing_status = 'UPLOADING'"),
+            sqlite_where=text("processing_status = 'UPLOADING'"),
+        ),
+    )
@@ -0,0 +1,20 @@
+from sqlalchemy import JSON, BigInteger, Column, ForeignKey, Integer, String
+
+from app.db import Base
+
+
+class UploadSession(Base):
+    """Progress of a resumable upload; one per UPLOADING file.
+
+    Chunk n is multipart part n + 1, so `etags` lists the parts stored so
+    far in order and `offset` is the number of bytes they hold.
+    """
+
+    __tablename__ = "upload_sessions"
+
+    file_id = Column(
+        Integer, ForeignKey("files.id", ondelete="CASCADE"), primary_key=True
+    )
+    upload_id = Column(String, nullable=False)
+    offset = Column(BigInteger, nullable=False, default=0)
+    etags = Column(JSON, nullable=False, default=list)
@@ -0,0 +1,35 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer
+
+from app.db import Base
+
+
+class UserUsage(Base):
+    """Running totals over the files a user owns.
+
+    Kept in step with `files` by the upload, delete and download paths in
+    the same transactions; scripts.reconcile_usage rebuilds them.
+    """
+
+    __tablename__ = "user_usage"
+
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    bytes_used = Column(BigInteger, nullable=False, default=0)
+    file_count = Column(Integer, nullable=False, default=0)
+    download_count = Column(BigInteger, nullable=False, default=0)
+
+
+class DepartmentUsage(Base):
+    """UserUsage for the files of a department."""
+
+    __tablename__ = "department_usage"
+
+    department_id = Column(
+        Integer,
+        ForeignKey("departments.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    bytes_used = Column(BigInteger, nullable=False, default=0)
+    file_count = Column(Integer, nullable=False, default=0)
+    download_count = Column(BigInteger, nullable=False, default=0)
@@ -6,7 +6,7 @@ from sqlalchemy.orm import relationship
 from app.db import Base
 
 
-class Role(enum.Enum):
+class Role(str, enum.Enum):
     USER = "USER"
     MANAGER = "MANAGER"
     ADMIN = "ADMIN"
@@ -21,7 +21,7 @@ class User(Base):
     role = Column(Enum(Role), default=Role.USER, nullable=False)
 
     department_id = Column(
-        Integer, ForeignKey("departments.id"), nullable=True
+        Integer, ForeignKey("departments.id"), nullable=True, index=True
     )
 
     department = relationship("Department", back_populates="users")
@@ -1,13 +1,18 @@
+from dataclasses import asdict
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.auth import get_current_user
-from app.core.security import create_access_token, verify_password
+from app.core.responses import ORJSONResponse
+from app.core.security import create_access_token
 from app.db import get_db
 from app.models import User
 from app.schemas.users import TokenOut, UserRead
+from app.services.hashing import PasswordHasher, get_hasher
+from app.services.principals import Principal
 
 router = APIRouter()
 
@@ -16,14 +21,23 @@ router = APIRouter()
 async def login(
     form: OAuth2PasswordRequestForm = Depends(),
     db: AsyncSession = Depends(get_db),
+    hasher: PasswordHasher = Depends(get_hasher),
 ):
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid username or password",
+    )
     q = await db.execute(select(User).where(User.username == form.username))
     user = q.scalar_one_or_none()
-    if not user or not verify_password(form.password, user.password_hash):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid username or password",
-        )
+    if not user:
+        raise invalid
+    ok, new_hash = await hasher.verify(form.password, user.password_hash)
+    if not ok:
+        raise invalid
+    if new_hash:
+        # BCRYPT_ROUNDS changed since this hash was made
+        user.password_hash = new_hash
+        await db.commit()
 
     token = create_access_token(
         {"sub": user.username, "role": user.role.value}
@@ -32,5 +46,6 @@ async def login(
 
 
 @router.get("/me", response_model=UserRead)
-async def me(current_user: User = Depends(get_current_user)):
-    return current_user
+async def me(current_user: Principal = Depends(get_current_user)):
+    # Principal carries exactly the UserRead fields
+    return ORJSONResponse(asdict(current_user))
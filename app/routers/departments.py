@@ -1,15 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import delete, select
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import delete, exists, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.auth import require_roles
-from app.db import get_db
-from app.models import Department, User
-from app.schemas.departments import DepartmentCreate, DepartmentRead
+from app.core.pagination import (
+    PageParams,
+    finish_page,
+    keyset,
+    ndjson_response,
+    page_params,
+)
+from app.core.responses import ORJSONResponse
+from app.db import columns_for, get_db, get_read_db
+from app.models import Department, File, User
+from app.schemas.departments import (
+    DepartmentCreate,
+    DepartmentMembers,
+    DepartmentMove,
+    DepartmentRead,
+    MembershipResult,
+    MergeResult,
+)
+from app.services.principals import principal_cache
+from app.services.usage import move_department_usage
 
 router = APIRouter(prefix="/departments", tags=["Departments"])
 
 
+async def department_exists(db: AsyncSession, dept_id: int) -> bool:
+    return await db.scalar(select(exists().where(Department.id == dept_id)))
+
+
+async def move_members(
+    db: AsyncSession, user_ids: list[int], target: int | None, *where
+) -> MembershipResult:
+    """Set department_id for the listed users in one UPDATE ... RETURNING.
+
+    Users that do not exist or do not match `where` are reported as
+    skipped. Commits and invalidates the moved users' cached principals.
+    """
+    res = await db.execute(
+        update(User)
+        .where(User.id.in_(user_ids), *where)
+        .values(department_id=target)
+        .returning(User.id, User.username)
+    )
+    moved = res.all()
+    await db.commit()
+    await principal_cache.invalidate(*(username for _, username in moved))
+    updated = {uid for uid, _ in moved}
+    return MembershipResult(
+        updated=sorted(updated),
+        skipped=sorted(set(user_ids) - updated),
+    )
+
+
 @router.post(
     "/",
     response_model=DepartmentRead,
@@ -30,9 +75,20 @@ async def create_department(
     response_model=list[DepartmentRead],
     dependencies=[Depends(require_roles("ADMIN", "MANAGER"))],
 )
-async def list_departments(db: AsyncSession = Depends(get_db)):
-    res = await db.execute(select(Department))
-    return list(res.scalars().all())
+async def list_departments(
+    response: Response,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_read_db),
+):
+    stmt = keyset(
+        select(*columns_for(Department, DepartmentRead)), Department.id, page
+    )
+    if page.stream:
+        return ndjson_response(stmt, db)
+    res = await db.execute(stmt)
+    rows = finish_page(res.all(), page, response)
+    departments = [row._asdict() for row in rows]
+    return ORJSONResponse(departments, headers=response.headers)
 
 
 @router.get(
@@ -40,7 +96,7 @@ async def list_departments(db: AsyncSession = Depends(get_db)):
     response_model=DepartmentRead,
     dependencies=[Depends(require_roles("ADMIN", "MANAGER"))],
 )
-async def get_department(dept_id: int, db: AsyncSession = Depends(get_db)):
+async def get_department(dept_id: int, db: AsyncSession = Depends(get_read_db)):
     d = (
         await db.execute(select(Department).where(Department.id == dept_id))
     ).scalar_one_or_none()
@@ -76,10 +132,7 @@ async def update_department(
 async def assign_user(
     dept_id: int, user_id: int, db: AsyncSession = Depends(get_db)
 ):
-    d = (
-        await db.execute(select(Department).where(Department.id == dept_id))
-    ).scalar_one_or_none()
-    if not d:
+    if not await department_exists(db, dept_id):
         raise HTTPException(404, "Department not found")
     u = (
         await db.execute(select(User).where(User.id == user_id))
@@ -88,6 +141,7 @@ async def assign_user(
         raise HTTPException(404, "User not found")
     u.department_id = dept_id
     await db.commit()
+    await principal_cache.invalidate(u.username)
     return {"ok": True}
 
 
@@ -107,26 +161,111 @@ async def remove_user(
         raise HTTPException(400, "User is not in this department")
     u.department_id = None
     await db.commit()
+    await principal_cache.invalidate(u.username)
     return {"ok": True}
 
 
+@router.post(
+    "/{dept_id}/members",
+    response_model=MembershipResult,
+    dependencies=[Depends(require_roles("ADMIN"))],
+)
+async def assign_users(
+    dept_id: int, payload: DepartmentMembers, db: AsyncSession = Depends(get_db)
+):
+    """Assign many users to the department, wherever they are now."""
+    if not await department_exists(db, dept_id):
+        raise HTTPException(404, "Department not found")
+    return await move_members(db, payload.user_ids, dept_id)
+
+
+@router.post(
+    "/{dept_id}/members/remove",
+    response_model=MembershipResult,
+    dependencies=[Depends(require_roles("ADMIN"))],
+)
+async def remove_users(
+    dept_id: int, payload: DepartmentMembers, db: AsyncSession = Depends(get_db)
+):
+    """Remove many users from the department; others are skipped."""
+    return await move_members(
+        db, payload.user_ids, None, User.department_id == dept_id
+    )
+
+
+@router.post(
+    "/{dept_id}/members/move",
+    response_model=MembershipResult,
+    dependencies=[Depends(require_roles("ADMIN"))],
+)
+async def move_users(
+    dept_id: int, payload: DepartmentMove, db: AsyncSession = Depends(get_db)
+):
+    """Move users of this department to another one; others are skipped."""
+    if not await department_exists(db, payload.target_department_id):
+        raise HTTPException(404, "Target department not found")
+    return await move_members(
+        db,
+        payload.user_ids,
+        payload.target_department_id,
+        User.department_id == dept_id,
+    )
+
+
+@router.post(
+    "/{dept_id}/merge/{target_id}",
+    response_model=MergeResult,
+    dependencies=[Depends(require_roles("ADMIN"))],
+)
+async def merge_department(
+    dept_id: int, target_id: int, db: AsyncSession = Depends(get_db)
+):
+    """Move every user and file into `target_id` and delete this department,
+    all in one transaction."""
+    if dept_id == target_id:
+        raise HTTPException(400, "Cannot merge a department into itself")
+    found = (
+        await db.execute(
+            select(Department.id).where(Department.id.in_([dept_id, target_id]))
+        )
+    ).scalars()
+    missing = {dept_id, target_id} - set(found)
+    if missing:
+        raise HTTPException(404, "Department not found")
+
+    users = await db.execute(
+        update(User)
+        .where(User.department_id == dept_id)
+        .values(department_id=target_id)
+        .returning(User.username)
+    )
+    moved = list(users.scalars())
+    files = await db.execute(
+        update(File)
+        .where(File.department_id == dept_id)
+        .values(department_id=target_id)
+    )
+    await move_department_usage(db, dept_id, target_id)
+    await db.execute(delete(Department).where(Department.id == dept_id))
+    await db.commit()
+    await principal_cache.invalidate(*moved)
+    return MergeResult(users_moved=len(moved), files_moved=files.rowcount)
+
+
 @router.delete(
     "/{dept_id}",
     dependencies=[Depends(require_roles("ADMIN"))],
 )
 async def delete_department(dept_id: int, db: AsyncSession = Depends(get_db)):
-    d = (
-        await db.execute(select(Department).where(Department.id == dept_id))
-    ).scalar_one_or_none()
-    if not d:
+    if not await department_exists(db, dept_id):
         raise HTTPException(404, "Department not found")
 
-    res = await db.execute(select(User).where(User.department_id == dept_id))
-    users = res.scalars().all()
-    if users:
+    if await db.scalar(select(exists().where(User.department_id == dept_id))):
         raise HTTPException(
             400, "Cannot delete department with assigned users"
         )
+    if await db.scalar(select(exists().where(File.department_id == dept_id))):
+        raise HTTPException(400, "Cannot delete department with files")
 
     await db.execute(delete(Department).where(Department.id == dept_id))
     await db.commit()
@@ -1,4 +1,10 @@
-import io
+import asyncio
+import json
+import logging
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO
 
 from fastapi import (
     APIRouter,
@@ -6,19 +12,67 @@ from fastapi import (
 )
 from fastapi import File as Upload
 from fastapi import (
+    Form,
+    Header,
     HTTPException,
+    Query,
+    Request,
+    Response,
     UploadFile,
 )
-from sqlalchemy import and_, delete, or_, select
+from fastapi.responses import RedirectResponse
+from sqlalchemy import delete, exists, select, update
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
 from app.core.auth import get_current_user
-from app.db import get_db
+from app.core.pagination import (
+    PageParams,
+    finish_page,
+    keyset,
+    ndjson_response,
+    page_params,
+)
+from app.core.policy import can_create_visibility, delete_clause, view_clause
+from app.core.responses import ORJSONResponse, file_response
+from app.db import async_session_maker, columns_for, get_db, get_read_db
+from app.models import Blob
 from app.models import File as FileModel
-from app.models import User
-from app.schemas.files import FileCreate, FileRead
-from app.services.storage import ensure_bucket, get_minio
+from app.models import ProcessingStatus, UploadSession
+from app.schemas.files import (
+    BatchUploadResult,
+    DirectUploadCreate,
+    DirectUploadTicket,
+    FileCreate,
+    FileRead,
+    ResumableUpload,
+    Visibility,
+)
+from app.services.archives import ZIP_TYPES, unpack_zip
+from app.services.blobs import (
+    acquire_blobs,
+    blob_key,
+    digest_stream,
+    release_blob,
+    store_blob,
+)
+from app.services.counters import download_counter
+from app.services.principals import Principal
+from app.services.search import SearchMode, filename_clause, meta_clause
+from app.services.storage import SizeLimitExceeded, StorageService, get_storage
+from app.services.uploads import discard_upload, read_chunk, upload_key
+from app.services.usage import (
+    USAGE_COLUMNS,
+    QuotaExceeded,
+    charge_usage,
+    release_usage,
+    remaining_quota,
+)
+from app.services.url_cache import url_cache
+from app.tasks import extract_metadata
+
+logger = logging.getLogger("app")
 
 router = APIRouter(prefix="/files", tags=["Files"])
 
@@ -28,181 +82,870 @@ MAX_SIZE = {
     "ADMIN": 100 * 1024 * 1024,
 }
 PDF_ONLY_FOR_USER = True
+QUOTA_EXCEEDED = "Storage quota exceeded"
 
 
-def can_create_visibility(role: str, vis: str) -> bool:
-    if role == "USER":
-        return vis == "PRIVATE"
-    return True
+# direct and resumable uploads in progress are not files yet
+READY = FileModel.processing_status != ProcessingStatus.UPLOADING
+# hot reads select just these and return them without ORM objects
+FILE_READ_COLUMNS = columns_for(FileModel, FileRead)
 
 
-def can_view(user: User, f: FileModel) -> bool:
-    if user.role == "ADMIN":
-        return True
-    if f.visibility == "PUBLIC":
-        return True
-    if f.visibility == "PRIVATE":
-        return f.owner_id == user.id
-    if user.role in ("MANAGER",) and user.department_id is not None:
-        return True
-    return (user.department_id is not None) and (
-        f.department_id == user.department_id
+async def access_denied(
+    db: AsyncSession, file_id: int, *where
+) -> HTTPException:
+    """Error for a policy-filtered lookup that found nothing: 403 if the
+    file exists, 404 if not. Only runs on the failure path."""
+    found = await db.scalar(
+        select(exists().where(FileModel.id == file_id, *where))
     )
+    if found:
+        return HTTPException(403, "Forbidden")
+    return HTTPException(404, "File not found")
 
 
-def can_delete(user: User, f: FileModel) -> bool:
-    if user.role == "ADMIN":
-        return True
-    if f.owner_id == user.id:
-        return True
-    if (
-        user.role == "MANAGER"
-        and user.department_id
-        and user.department_id == f.department_id
-    ):
-        return True
-    return False
+def url_cache_key(f: FileModel) -> str:
+    # deduplicated files share a key but not a download filename
+    return f"{f.storage_key}#{f.filename}"
 
 
-@router.post("/upload", response_model=FileRead, status_code=201)
-async def upload_file(
-    meta: FileCreate,
-    uploaded: UploadFile = Upload(...),
-    db: AsyncSession = Depends(get_db),
-    current: User = Depends(get_current_user),
+def check_upload(
+    current: Principal, content_type: str, visibility: str, size: int | None
 ):
-    content = await uploaded.read()
-    size = len(content)
-    if size > MAX_SIZE[current.role]:
+    """Per-file upload rules; raises HTTPException for the first broken one."""
+    if size is not None and size > MAX_SIZE[current.role]:
         raise HTTPException(413, "File too large for your role")
 
     if current.role == "USER" and PDF_ONLY_FOR_USER:
-        if uploaded.content_type not in ("application/pdf",):
+        if content_type not in ("application/pdf",):
             raise HTTPException(415, "USER role can upload only PDF")
 
-    if not can_create_visibility(current.role, meta.visibility):
+    if not can_create_visibility(current.role, visibility):
         raise HTTPException(
             403, "You cannot create files with this visibility"
         )
 
-    # store to MinIO
-    client = get_minio()
-    ensure_bucket(client, settings.S3_BUCKET)
-    object_name = uploaded.filename
+
+async def enqueue_metadata(file_ids: list[int]):
+    # metadata is filled in by a worker; files stay PENDING until then
+    sent: list[int] = []
+
+    def send():
+        for file_id in file_ids:
+            extract_metadata.delay(file_id)
+            sent.append(file_id)
+
+    try:
+        await asyncio.to_thread(send)
+    except Exception as e:
+        logger.exception("Could not enqueue metadata extraction for %s", file_ids)
+        # no worker will ever pick these up; don't leave them PENDING
+        unsent = [i for i in file_ids if i not in sent]
+        try:
+            async with async_session_maker() as session:
+                await session.execute(
+                    update(FileModel)
+                    .where(
+                        FileModel.id.in_(unsent),
+                        FileModel.processing_status == ProcessingStatus.PENDING,
+                    )
+                    .values(
+                        processing_status=ProcessingStatus.FAILED,
+                        meta={"error": f"Could not enqueue: {e}"},
+                    )
+                )
+                await session.commit()
+        except Exception:
+            logger.exception("Could not mark %s as FAILED", unsent)
+
+
+@router.post("/upload", response_model=FileRead, status_code=201)
+async def upload_file(
+    visibility: Visibility = Form("PRIVATE"),
+    uploaded: UploadFile = Upload(...),
+    db: AsyncSession = Depends(get_db),
+    current: Principal = Depends(get_current_user),
+    storage: StorageService = Depends(get_storage),
+):
+    content_type = uploaded.content_type or "application/octet-stream"
+    meta = FileCreate(visibility=visibility)
+    check_upload(current, content_type, meta.visibility, uploaded.size)
+
+    # hash the spooled upload first: duplicates never reach storage
+    try:
+        digest, size = await asyncio.to_thread(
+            digest_stream, uploaded.file, MAX_SIZE[current.role]
+        )
+    except SizeLimitExceeded:
+        raise HTTPException(413, "File too large for your role")
+    remaining = await remaining_quota(db, current.id, current.department_id)
+    if remaining is not None and size > remaining:
+        raise HTTPException(413, QUOTA_EXCEEDED)
     try:
-        client.put_object(
-            settings.S3_BUCKET,
-            object_name,
-            io.BytesIO(content),
-            length=size,
-            content_type=uploaded.content_type or "application/octet-stream",
+        key, created = await store_blob(
+            db, storage, uploaded.file, digest, size, content_type
         )
     except Exception as e:
         raise HTTPException(500, f"Storage error: {e}")
 
     f = FileModel(
-        filename=object_name,
+        filename=uploaded.filename,
+        storage_key=key,
+        digest=digest,
         owner_id=current.id,
         department_id=current.department_id,
         visibility=meta.visibility,
         meta={},
         size=size,
-        mime_type=uploaded.content_type or "application/octet-stream",
+        mime_type=content_type,
         download_count=0,
     )
     db.add(f)
+    try:
+        await charge_usage(db, current.id, current.department_id, size)
+    except QuotaExceeded as e:
+        # a concurrent upload raced us to the quota. Remove a new object
+        # while its blob row is still locked, before anyone else can
+        # store the same content again.
+        if created:
+            await discard_upload(storage, key, None)
+        await db.rollback()
+        raise HTTPException(413, str(e))
     await db.commit()
     await db.refresh(f)
+    await enqueue_metadata([f.id])
     return f
 
 
-@router.get("/", response_model=list[FileRead])
-async def list_files(
+@dataclass
+class BatchItem:
+    filename: str | None
+    content_type: str
+    raw: BinaryIO | None
+    error: HTTPException | None = None
+    digest: str | None = None
+    size: int | None = None
+    file: FileModel | None = None
+
+    def result(self) -> BatchUploadResult:
+        if self.error is not None:
+            return BatchUploadResult(
+                filename=self.filename,
+                ok=False,
+                status_code=self.error.status_code,
+                error=self.error.detail,
+            )
+        return BatchUploadResult(
+            filename=self.filename,
+            ok=True,
+            status_code=201,
+            file=FileRead.model_validate(self.file),
+        )
+
+
+@router.post("/upload/batch", response_model=list[BatchUploadResult])
+async def upload_batch(
+    uploaded: list[UploadFile] = Upload(...),
+    visibility: Visibility = Form("PRIVATE"),
+    explode_zip: bool = Form(False),
     db: AsyncSession = Depends(get_db),
-    current: User = Depends(get_current_user),
+    current: Principal = Depends(get_current_user),
+    storage: StorageService = Depends(get_storage),
 ):
-    if current.role == "ADMIN":
-        res = await db.execute(select(FileModel))
-        return list(res.scalars().all())
+    """Upload many files in one request.
 
-    if current.role == "MANAGER":
-        res = await db.execute(select(FileModel))
-        return list(res.scalars().all())
+    Every file gets the same checks as /files/upload and its own entry in
+    the response. Storage writes run BATCH_PARALLELISM at a time and all
+    rows are inserted in one transaction. With explode_zip, zip parts are
+    unpacked and each member is uploaded as a separate file.
+    """
+    limit = MAX_SIZE[current.role]
+    items: list[BatchItem] = []
+    spooled: list[BinaryIO] = []
+    unzip_budget = settings.BATCH_MAX_UNZIPPED_BYTES
+    if explode_zip:
+        # archives are unpacked to temp disk before any other check
+        remaining = await remaining_quota(db, current.id, current.department_id)
+        if remaining is not None:
+            unzip_budget = min(unzip_budget, remaining)
+    try:
+        for part in uploaded:
+            content_type = part.content_type or "application/octet-stream"
+            if not (explode_zip and content_type in ZIP_TYPES):
+                items.append(BatchItem(part.filename, content_type, part.file))
+                continue
+            try:
+                members, unpacked = await asyncio.to_thread(
+                    unpack_zip,
+                    part.file,
+                    limit,
+                    settings.BATCH_MAX_FILES,
+                    unzip_budget,
+                )
+                unzip_budget -= unpacked
+            except (zipfile.BadZipFile, ValueError) as e:
+                items.append(
+                    BatchItem(
+                        part.filename,
+                        content_type,
+                        None,
+                        error=HTTPException(400, f"Bad archive: {e}"),
+                    )
+                )
+                continue
+            for name, member_type, raw in members:
+                if isinstance(raw, SizeLimitExceeded):
+                    error = HTTPException(413, "File too large for your role")
+                    items.append(BatchItem(name, member_type, None, error))
+                else:
+                    spooled.append(raw)
+                    items.append(BatchItem(name, member_type, raw))
 
-    # USER
-    res = await db.execute(
-        select(FileModel).where(
-            or_(
-                FileModel.visibility == "PUBLIC",
-                and_(
-                    FileModel.visibility == "DEPARTMENT",
-                    FileModel.department_id == current.department_id,
-                ),
-                FileModel.owner_id == current.id,
+        if len(items) > settings.BATCH_MAX_FILES:
+            raise HTTPException(
+                400, f"At most {settings.BATCH_MAX_FILES} files per batch"
             )
+
+        slots = asyncio.Semaphore(settings.BATCH_PARALLELISM)
+
+        async def prepare(item: BatchItem):
+            try:
+                check_upload(current, item.content_type, visibility, None)
+                async with slots:
+                    item.digest, item.size = await asyncio.to_thread(
+                        digest_stream, item.raw, limit
+                    )
+            except SizeLimitExceeded:
+                item.error = HTTPException(413, "File too large for your role")
+            except HTTPException as e:
+                item.error = e
+
+        await asyncio.gather(*(prepare(i) for i in items if i.error is None))
+        remaining = await remaining_quota(db, current.id, current.department_id)
+        if remaining is not None:
+            # in upload order, while the files still fit
+            for i in items:
+                if i.error is None and i.size > remaining:
+                    i.error = HTTPException(413, QUOTA_EXCEEDED)
+                elif i.error is None:
+                    remaining -= i.size
+        accepted = [i for i in items if i.error is None]
+        if not accepted:
+            return [i.result() for i in items]
+
+        refs: dict[str, tuple[int, int]] = {}
+        source: dict[str, BatchItem] = {}
+        for i in accepted:
+            size, count = refs.get(i.digest, (i.size, 0))
+            refs[i.digest] = (size, count + 1)
+            source.setdefault(i.digest, i)
+        new = list(await acquire_blobs(db, refs))
+
+        async def put(digest: str):
+            item = source[digest]
+            async with slots:
+                await storage.put_stream(
+                    blob_key(digest), item.raw, item.size, item.content_type
+                )
+
+        outcomes = await asyncio.gather(
+            *(put(d) for d in new), return_exceptions=True
         )
+        failed = {
+            d: e for d, e in zip(new, outcomes) if isinstance(e, Exception)
+        }
+        if failed:
+            # these rows were inserted by this transaction, no one else
+            # holds a reference yet
+            await db.execute(delete(Blob).where(Blob.digest.in_(failed)))
+
+        for i in accepted:
+            if i.digest in failed:
+                i.error = HTTPException(500, f"Storage error: {failed[i.digest]}")
+                continue
+            i.file = FileModel(
+                filename=i.filename,
+                storage_key=blob_key(i.digest),
+                digest=i.digest,
+                owner_id=current.id,
+                department_id=current.department_id,
+                visibility=visibility,
+                meta={},
+                size=i.size,
+                mime_type=i.content_type,
+                download_count=0,
+            )
+        created = [i.file for i in accepted if i.file is not None]
+        db.add_all(created)
+        try:
+            await charge_usage(
+                db,
+                current.id,
+                current.department_id,
+                sum(f.size for f in created),
+                len(created),
+            )
+        except QuotaExceeded as e:
+            # lost a race to the quota: nothing from this batch is kept
+            for d in new:
+                if d not in failed:
+                    await discard_upload(storage, blob_key(d), None)
+            await db.rollback()
+            for i in accepted:
+                if i.file is not None:
+                    i.file, i.error = None, HTTPException(413, str(e))
+            return [i.result() for i in items]
+        await db.commit()
+        await enqueue_metadata([f.id for f in created])
+        return [i.result() for i in items]
+    finally:
+        for raw in spooled:
+            raw.close()
+
+
+@router.post("/uploads", response_model=DirectUploadTicket, status_code=201)
+async def reserve_upload(
+    body: DirectUploadCreate,
+    db: AsyncSession = Depends(get_db),
+    current: Principal = Depends(get_current_user),
+    storage: StorageService = Depends(get_storage),
+):
+    """First phase of a direct upload.
+
+    Applies the /files/upload checks to the declared size and type,
+    reserves an UPLOADING row and returns a POST policy that lets the
+    client send exactly that object straight to storage.
+    """
+    check_upload(current, body.content_type, body.visibility, body.size)
+    key = upload_key()
+    try:
+        ticket = await storage.presigned_post(key, body.content_type, body.size)
+    except Exception as e:
+        raise HTTPException(500, f"Storage error: {e}")
+    if ticket is None:
+        raise HTTPException(501, "Storage backend does not support direct uploads")
+
+    expires_at = datetime.now(timezone.utc) + timedelta(
+        seconds=settings.DIRECT_UPLOAD_EXPIRE
+    )
+    f = FileModel(
+        filename=body.filename,
+        storage_key=key,
+        owner_id=current.id,
+        department_id=current.department_id,
+        visibility=body.visibility,
+        meta={},
+        size=body.size,
+        mime_type=body.content_type,
+        download_count=0,
+        processing_status=ProcessingStatus.UPLOADING,
+        # a transfer started just before the policy expires still gets
+        # as long again to finish and be completed
+        upload_expires_at=expires_at
+        + timedelta(seconds=settings.DIRECT_UPLOAD_EXPIRE),
+    )
+    db.add(f)
+    # the declared size counts from the reservation on, so concurrent
+    # uploads cannot overshoot the quota together
+    try:
+        await charge_usage(db, current.id, current.department_id, body.size)
+    except QuotaExceeded as e:
+        await db.rollback()
+        raise HTTPException(413, str(e))
+    await db.commit()
+    url, fields = ticket
+    return DirectUploadTicket(
+        file_id=f.id, url=url, fields=fields, expires_at=expires_at
     )
-    return list(res.scalars().all())
 
 
-@router.get("/{file_id}", response_model=FileRead)
-async def get_file(
+async def check_direct_upload(
+    db: AsyncSession, storage: StorageService, f: FileModel
+):
+    """Make sure a presigned upload arrived as reserved."""
+    try:
+        found = await storage.stat(f.storage_key)
+    except Exception as e:
+        raise HTTPException(500, f"Storage error: {e}")
+    if found is None:
+        raise HTTPException(409, "Upload has not reached storage")
+    size, content_type = found
+    if size != f.size or (content_type and content_type != f.mime_type):
+        res = await db.execute(
+            delete(FileModel)
+            .where(FileModel.id == f.id)
+            .returning(*USAGE_COLUMNS)
+        )
+        await release_usage(db, res.all())
+        await db.commit()
+        await discard_upload(storage, f.storage_key, None)
+        raise HTTPException(422, "Uploaded object does not match the reservation")
+
+
+async def finish_resumable(
+    db: AsyncSession, storage: StorageService, f: FileModel, upload: UploadSession
+):
+    """Assemble the parts of a resumable upload that has every byte."""
+    if upload.offset != f.size:
+        raise HTTPException(
+            409,
+            "Upload is incomplete",
+            headers={"Upload-Offset": str(upload.offset)},
+        )
+    try:
+        await storage.complete_multipart(
+            f.storage_key, upload.upload_id, upload.etags
+        )
+    except Exception as e:
+        raise HTTPException(500, f"Storage error: {e}")
+    await db.delete(upload)
+
+
+@router.post("/uploads/{file_id}/complete", response_model=FileRead)
+async def complete_upload(
     file_id: int,
     db: AsyncSession = Depends(get_db),
-    current: User = Depends(get_current_user),
+    current: Principal = Depends(get_current_user),
+    storage: StorageService = Depends(get_storage),
 ):
+    """Finish a direct or resumable upload: check the stored object
+    against the reservation and make the file visible. Safe to repeat."""
     res = await db.execute(select(FileModel).where(FileModel.id == file_id))
     f = res.scalar_one_or_none()
-    if not f:
-        raise HTTPException(404, "File not found")
-    if not can_view(current, f):
-        raise HTTPException(403, "Forbidden")
+    if not f or f.owner_id != current.id:
+        raise HTTPException(404, "Upload not found")
+    if f.processing_status != ProcessingStatus.UPLOADING:
+        return f
+
+    upload = await db.get(UploadSession, f.id)
+    if upload is not None:
+        await finish_resumable(db, storage, f, upload)
+    else:
+        await check_direct_upload(db, storage, f)
+
+    res = await db.execute(
+        update(FileModel)
+        .where(
+            FileModel.id == f.id,
+            FileModel.processing_status == ProcessingStatus.UPLOADING,
+        )
+        .values(
+            processing_status=ProcessingStatus.PENDING, upload_expires_at=None
+        )
+    )
+    if res.rowcount == 0:
+        # the reaper got there first
+        raise HTTPException(404, "Upload not found")
+    await db.commit()
+    await db.refresh(f)
+    await enqueue_metadata([f.id])
     return f
 
 
-@router.get("/{file_id}/download")
-async def download_file(
+@router.post("/uploads/resumable", response_model=ResumableUpload, status_code=201)
+async def create_resumable_upload(
+    body: DirectUploadCreate,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current: Principal = Depends(get_current_user),
+    storage: StorageService = Depends(get_storage),
+):
+    """Start a resumable upload of the declared file.
+
+    Chunks become multipart parts as they arrive and the progress is kept
+    in upload_sessions, so any worker can take the next chunk. The session
+    expires DIRECT_UPLOAD_EXPIRE seconds after its last chunk.
+    """
+    check_upload(current, body.content_type, body.visibility, body.size)
+    key = upload_key()
+    try:
+        upload_id = await storage.create_multipart(key, body.content_type)
+    except Exception as e:
+        raise HTTPException(500, f"Storage error: {e}")
+
+    expires_at = datetime.now(timezone.utc) + timedelta(
+        seconds=settings.DIRECT_UPLOAD_EXPIRE
+    )
+    f = FileModel(
+        filename=body.filename,
+        storage_key=key,
+        owner_id=current.id,
+        department_id=current.department_id,
+        visibility=body.visibility,
+        meta={},
+        size=body.size,
+        mime_type=body.content_type,
+        download_count=0,
+        processing_status=ProcessingStatus.UPLOADING,
+        upload_expires_at=expires_at,
+    )
+    db.add(f)
+    await db.flush()
+    db.add(UploadSession(file_id=f.id, upload_id=upload_id, offset=0, etags=[]))
+    try:
+        await charge_usage(db, current.id, current.department_id, body.size)
+    except QuotaExceeded as e:
+        await db.rollback()
+        await discard_upload(storage, key, upload_id)
+        raise HTTPException(413, str(e))
+    await db.commit()
+
+    response.headers["Location"] = f"/files/uploads/{f.id}"
+    response.headers["Upload-Offset"] = "0"
+    return ResumableUpload(
+        file_id=f.id,
+        size=f.size,
+        offset=0,
+        chunk_size=settings.UPLOAD_PART_SIZE,
+        expires_at=expires_at,
+    )
+
+
+async def load_upload(
+    db: AsyncSession, file_id: int, current: Principal, lock: bool = False
+) -> tuple[FileModel, UploadSession]:
+    stmt = (
+        select(FileModel, UploadSession)
+        .join(UploadSession, UploadSession.file_id == FileModel.id)
+        .where(FileModel.id == file_id)
+    )
+    if lock:
+        # one chunk at a time per upload; a concurrent one fails fast
+        stmt = stmt.with_for_update(of=UploadSession, nowait=True)
+    try:
+        row = (await db.execute(stmt)).one_or_none()
+    except DBAPIError:
+        raise HTTPException(409, "Another chunk of this upload is in progress")
+    if row is None or row[0].owner_id != current.id:
+        raise HTTPException(404, "Upload not found")
+    return row[0], row[1]
+
+
+@router.head("/uploads/{file_id}")
+async def get_upload_offset(
     file_id: int,
     db: AsyncSession = Depends(get_db),
-    current: User = Depends(get_current_user),
+    current: Principal = Depends(get_current_user),
 ):
-    res = await db.execute(select(FileModel).where(FileModel.id == file_id))
-    f = res.scalar_one_or_none()
-    if not f:
-        raise HTTPException(404, "File not found")
-    if not can_view(current, f):
-        raise HTTPException(403, "Forbidden")
+    """Where to resume: the number of bytes stored so far."""
+    f, upload = await load_upload(db, file_id, current)
+    return Response(
+        headers={
+            "Upload-Offset": str(upload.offset),
+            "Upload-Length": str(f.size),
+            "Cache-Control": "no-store",
+        }
+    )
 
-    client = get_minio()
+
+@router.patch("/uploads/{file_id}", status_code=204)
+async def upload_chunk(
+    file_id: int,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    db: AsyncSession = Depends(get_db),
+    current: Principal = Depends(get_current_user),
+    storage: StorageService = Depends(get_storage),
+):
+    """Store the chunk that starts at Upload-Offset.
+
+    Every chunk but the last must be exactly chunk_size bytes, so chunk n
+    is always part n + 1 and a resent chunk replaces its part. The total
+    can never pass the declared size, which check_upload held to the
+    role's MAX_SIZE.
+    """
+    part_size = settings.UPLOAD_PART_SIZE
+    # no connection is held while the chunk arrives
+    await db.rollback()
+    try:
+        data = await read_chunk(request.stream(), part_size)
+    except SizeLimitExceeded:
+        raise HTTPException(413, f"Chunks are at most {part_size} bytes")
+
+    f, upload = await load_upload(db, file_id, current, lock=True)
+    if upload_offset != upload.offset:
+        raise HTTPException(
+            409,
+            "Upload-Offset does not match the upload",
+            headers={"Upload-Offset": str(upload.offset)},
+        )
+    if upload.offset >= f.size:
+        raise HTTPException(
+            409,
+            "Upload already has all its bytes",
+            headers={"Upload-Offset": str(upload.offset)},
+        )
+    if not data:
+        raise HTTPException(
+            400, "Empty chunk", headers={"Upload-Offset": str(upload.offset)}
+        )
+    expected = min(part_size, f.size - upload.offset)
+    if len(data) != expected:
+        raise HTTPException(
+            400,
+            f"Expected a chunk of {expected} bytes",
+            headers={"Upload-Offset": str(upload.offset)},
+        )
+
+    part_number = upload.offset // part_size + 1
     try:
-        url = client.presigned_get_object(settings.S3_BUCKET, f.filename)
+        etag = await storage.upload_part(
+            f.storage_key, upload.upload_id, part_number, data
+        )
     except Exception as e:
         raise HTTPException(500, f"Storage error: {e}")
 
-    f.download_count += 1
+    upload.offset += len(data)
+    upload.etags = [*upload.etags, etag]
+    f.upload_expires_at = datetime.now(timezone.utc) + timedelta(
+        seconds=settings.DIRECT_UPLOAD_EXPIRE
+    )
     await db.commit()
+    return Response(status_code=204, headers={"Upload-Offset": str(upload.offset)})
+
+
+def file_filters(
+    visibility: Visibility | None = None,
+    owner_id: int | None = None,
+    department_id: int | None = None,
+    mime_type: str | None = None,
+    min_size: int | None = Query(None, ge=0),
+    max_size: int | None = Query(None, ge=0),
+) -> list:
+    clauses = []
+    if visibility is not None:
+        clauses.append(FileModel.visibility == visibility)
+    if owner_id is not None:
+        clauses.append(FileModel.owner_id == owner_id)
+    if department_id is not None:
+        clauses.append(FileModel.department_id == department_id)
+    if mime_type is not None:
+        clauses.append(FileModel.mime_type == mime_type)
+    if min_size is not None:
+        clauses.append(FileModel.size >= min_size)
+    if max_size is not None:
+        clauses.append(FileModel.size <= max_size)
+    return clauses
+
+
+def list_files_query(current: Principal, filters: list, page: PageParams):
+    """The query list_files runs; scripts/check_query_plans EXPLAINs it."""
+    stmt = select(*FILE_READ_COLUMNS).where(
+        *filters, READY, view_clause(current)
+    )
+    return keyset(stmt, FileModel.id, page)
+
+
+@router.get("/", response_model=list[FileRead])
+async def list_files(
+    response: Response,
+    page: PageParams = Depends(page_params),
+    filters: list = Depends(file_filters),
+    db: AsyncSession = Depends(get_read_db),
+    current: Principal = Depends(get_current_user),
+):
+    stmt = list_files_query(current, filters, page)
+    if page.stream:
+        return ndjson_response(stmt, db)
+    res = await db.execute(stmt)
+    rows = finish_page(res.all(), page, response)
+    files = [row._asdict() for row in rows]
+    await download_counter.apply_rows(files)
+    return ORJSONResponse(files, headers=response.headers)
+
+
+@router.get("/search", response_model=list[FileRead])
+async def search_files(
+    response: Response,
+    q: str | None = Query(None, min_length=1, max_length=255),
+    mode: SearchMode = "substring",
+    meta: str | None = Query(
+        None, description='JSON object the metadata must contain, e.g. {"pages": 1}'
+    ),
+    page: PageParams = Depends(page_params),
+    filters: list = Depends(file_filters),
+    db: AsyncSession = Depends(get_read_db),
+    current: Principal = Depends(get_current_user),
+):
+    """Find files by filename and metadata, with list_files' filters,
+    visibility rules and pagination."""
+    clauses = []
+    if q is not None:
+        clauses.append(filename_clause(q, mode))
+    if meta is not None:
+        try:
+            match = json.loads(meta)
+        except json.JSONDecodeError:
+            raise HTTPException(400, "meta must be a JSON object")
+        if not isinstance(match, dict):
+            raise HTTPException(400, "meta must be a JSON object")
+        try:
+            clauses.append(meta_clause(db.get_bind().dialect.name, match))
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+    if not clauses:
+        raise HTTPException(400, "Give q or meta to search")
+
+    stmt = select(*FILE_READ_COLUMNS).where(
+        *clauses, *filters, READY, view_clause(current)
+    )
+    stmt = keyset(stmt, FileModel.id, page)
+    if page.stream:
+        return ndjson_response(stmt, db)
+    res = await db.execute(stmt)
+    rows = finish_page(res.all(), page, response)
+    files = [row._asdict() for row in rows]
+    await download_counter.apply_rows(files)
+    return ORJSONResponse(files, headers=response.headers)
+
+
+@router.get("/{file_id}", response_model=FileRead)
+async def get_file(
+    file_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current: Principal = Depends(get_current_user),
+):
+    res = await db.execute(
+        select(*FILE_READ_COLUMNS).where(
+            FileModel.id == file_id, READY, view_clause(current)
+        )
+    )
+    row = res.one_or_none()
+    if row is None:
+        raise await access_denied(db, file_id, READY)
+    f = row._asdict()
+    await download_counter.apply_rows([f])
+    return ORJSONResponse(f)
+
+
+@router.get("/{file_id}/download")
+async def download_file(
+    file_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    current: Principal = Depends(get_current_user),
+    storage: StorageService = Depends(get_storage),
+):
+    res = await db.execute(
+        select(FileModel.id, FileModel.storage_key, FileModel.filename).where(
+            FileModel.id == file_id, READY, view_clause(current)
+        )
+    )
+    f = res.one_or_none()
+    if f is None:
+        raise await access_denied(db, file_id, READY)
+
+    cache_key = url_cache_key(f)
+    url = await url_cache.get(cache_key)
+    if url is None:
+        try:
+            url = await storage.presigned_get(f.storage_key, f.filename)
+        except Exception as e:
+            raise HTTPException(500, f"Storage error: {e}")
+        if url is None:
+            # backend cannot sign URLs, the API serves the bytes itself
+            # and /content counts the download when it does
+            return {"url": str(request.url_for("get_file_content", file_id=f.id))}
+        await url_cache.set(cache_key, url)
+
+    await download_counter.incr(f.id)
     return {"url": url}
 
 
+@router.get("/{file_id}/content")
+async def get_file_content(
+    file_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    current: Principal = Depends(get_current_user),
+    storage: StorageService = Depends(get_storage),
+):
+    """File bytes with Range, ETag and Last-Modified support.
+
+    Served from disk by the local backend; other backends redirect to a
+    presigned URL.
+    """
+    res = await db.execute(
+        select(
+            FileModel.id,
+            FileModel.storage_key,
+            FileModel.filename,
+            FileModel.mime_type,
+            FileModel.digest,
+        ).where(FileModel.id == file_id, READY, view_clause(current))
+    )
+    f = res.one_or_none()
+    if f is None:
+        raise await access_denied(db, file_id, READY)
+
+    path = storage.local_path(f.storage_key)
+    if path is None:
+        try:
+            url = await storage.presigned_get(f.storage_key, f.filename)
+        except Exception as e:
+            raise HTTPException(500, f"Storage error: {e}")
+        await download_counter.incr(f.id)
+        return RedirectResponse(url, status_code=307)
+
+    try:
+        response = await asyncio.to_thread(
+            file_response, request, path, f.mime_type, f.filename, f.digest
+        )
+    except FileNotFoundError:
+        raise HTTPException(404, "File content not found")
+    if response.status_code == 200:
+        # ranged and revalidated requests are resumes, not new downloads
+        await download_counter.incr(f.id)
+    return response
+
+
 @router.delete("/{file_id}")
 async def delete_file(
     file_id: int,
     db: AsyncSession = Depends(get_db),
-    current: User = Depends(get_current_user),
+    current: Principal = Depends(get_current_user),
+    storage: StorageService = Depends(get_storage),
 ):
-    res = await db.execute(select(FileModel).where(FileModel.id == file_id))
-    f = res.scalar_one_or_none()
-    if not f:
-        raise HTTPException(404, "File not found")
-    if not can_delete(current, f):
-        raise HTTPException(403, "Forbidden")
+    res = await db.execute(
+        delete(FileModel)
+        .where(FileModel.id == file_id, delete_clause(current))
+        .returning(
+            FileModel.storage_key,
+            FileModel.filename,
+            FileModel.digest,
+            FileModel.processing_status,
+            *USAGE_COLUMNS,
+            # read before the cascade removes the session
+            select(UploadSession.upload_id)
+            .where(UploadSession.file_id == FileModel.id)
+            .scalar_subquery()
+            .label("upload_id"),
+        )
+    )
+    f = res.one_or_none()
+    if f is None:
+        raise await access_denied(db, file_id)
 
-    client = get_minio()
-    try:
-        client.remove_object(settings.S3_BUCKET, f.filename)
-    except Exception:
-        pass
+    if f.processing_status == ProcessingStatus.UPLOADING:
+        await release_usage(db, [f])
+        await db.execute(
+            delete(UploadSession).where(UploadSession.file_id == file_id)
+        )
+        await db.commit()
+        await discard_upload(storage, f.storage_key, f.upload_id)
+        return {"ok": True}
 
-    await db.execute(delete(FileModel).where(FileModel.id == file_id))
+    # files stored before deduplication own their object outright
+    last_ref = await release_blob(db, f.digest) if f.digest else True
+    # after the blob, the order uploads take these locks in
+    await release_usage(db, [f])
+    if last_ref:
+        # while the blob row is still locked: once it is committed away a
+        # concurrent upload may store the same content under this key
+        try:
+            await storage.remove(f.storage_key)
+        except Exception:
+            logger.exception("Could not remove %s", f.storage_key)
     await db.commit()
+    await url_cache.evict(url_cache_key(f))
     return {"ok": True}
@@ -0,0 +1,117 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import BigInteger, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.auth import require_roles
+from app.core.pagination import (
+    PageParams,
+    finish_page,
+    keyset,
+    ndjson_response,
+    page_params,
+)
+from app.core.responses import ORJSONResponse
+from app.db import get_read_db
+from app.models import Department, DepartmentUsage, User, UserUsage
+from app.schemas.usage import UsageRead
+
+router = APIRouter(prefix="/usage", tags=["Usage"])
+
+
+def usage_select(entity, usage, key, quota: int):
+    """Every row of `entity` with its usage counters, zero where nothing
+    was ever stored. Reads only the precomputed usage rows."""
+    return (
+        select(
+            entity.id,
+            func.coalesce(usage.bytes_used, 0).label("bytes_used"),
+            func.coalesce(usage.file_count, 0).label("file_count"),
+            func.coalesce(usage.download_count, 0).label("download_count"),
+            literal(quota or None, BigInteger).label("quota_bytes"),
+        )
+        .select_from(entity)
+        .outerjoin(usage, key == entity.id)
+    )
+
+
+USER_USAGE = usage_select(
+    User, UserUsage, UserUsage.user_id, settings.USER_QUOTA_BYTES
+)
+DEPARTMENT_USAGE = usage_select(
+    Department,
+    DepartmentUsage,
+    DepartmentUsage.department_id,
+    settings.DEPARTMENT_QUOTA_BYTES,
+)
+
+
+async def page_response(
+    db: AsyncSession, stmt, key, page: PageParams, response: Response
+):
+    stmt = keyset(stmt, key, page)
+    if page.stream:
+        return ndjson_response(stmt, db)
+    res = await db.execute(stmt)
+    rows = finish_page(res.all(), page, response)
+    return ORJSONResponse(
+        [row._asdict() for row in rows], headers=response.headers
+    )
+
+
+@router.get(
+    "/users",
+    response_model=list[UsageRead],
+    dependencies=[Depends(require_roles("ADMIN", "MANAGER"))],
+)
+async def list_user_usage(
+    response: Response,
+    department_id: int | None = None,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_read_db),
+):
+    stmt = USER_USAGE
+    if department_id is not None:
+        stmt = stmt.where(User.department_id == department_id)
+    return await page_response(db, stmt, User.id, page, response)
+
+
+@router.get(
+    "/users/{user_id}",
+    response_model=UsageRead,
+    dependencies=[Depends(require_roles("ADMIN", "MANAGER"))],
+)
+async def get_user_usage(user_id: int, db: AsyncSession = Depends(get_read_db)):
+    row = (await db.execute(USER_USAGE.where(User.id == user_id))).one_or_none()
+    if row is None:
+        raise HTTPException(404, "User not found")
+    return ORJSONResponse(row._asdict())
+
+
+@router.get(
+    "/departments",
+    response_model=list[UsageRead],
+    dependencies=[Depends(require_roles("ADMIN", "MANAGER"))],
+)
+async def list_department_usage(
+    response: Response,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_read_db),
+):
+    return await page_response(
+        db, DEPARTMENT_USAGE, Department.id, page, response
+    )
+
+
+@router.get(
+    "/departments/{dept_id}",
+    response_model=UsageRead,
+    dependencies=[Depends(require_roles("ADMIN", "MANAGER"))],
+)
+async def get_department_usage(dept_id: int, db: AsyncSession = Depends(get_read_db)):
+    row = (
+        await db.execute(DEPARTMENT_USAGE.where(Department.id == dept_id))
+    ).one_or_none()
+    if row is None:
+        raise HTTPException(404, "Department not found")
+    return ORJSONResponse(row._asdict())
@@ -1,12 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from typing import Literal
+
+from fastapi import APIRouter, Depends
+from fastapi import File as Upload
+from fastapi import HTTPException, Response, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.auth import get_current_user, require_roles
-from app.core.security import hash_password
-from app.db import get_db
+from app.core.pagination import (
+    PageParams,
+    finish_page,
+    keyset,
+    ndjson_response,
+    page_params,
+)
+from app.core.responses import ORJSONResponse
+from app.db import columns_for, get_db, get_read_db
 from app.models import User
 from app.schemas.users import UserCreate, UserRead, UserUpdate, UserUpdateRole
+from app.services.hashing import PasswordHasher, get_hasher
+from app.services.principals import principal_cache
+from app.services.user_import import parse_rows, run_import
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -16,7 +32,11 @@ router = APIRouter(prefix="/users", tags=["Users"])
     response_model=UserRead,
     dependencies=[Depends(require_roles("ADMIN"))],
 )
-async def create_user(payload: UserCreate, db: AsyncSession = Depends(get_db)):
+async def create_user(
+    payload: UserCreate,
+    db: AsyncSession = Depends(get_db),
+    hasher: PasswordHasher = Depends(get_hasher),
+):
     # unique username check
     q = await db.execute(select(User).where(User.username == payload.username))
     if q.scalar_one_or_none():
@@ -24,7 +44,7 @@ async def create_user(payload: UserCreate, db: AsyncSession = Depends(get_db)):
 
     user = User(
         username=payload.username,
-        password_hash=hash_password(payload.password),
+        password_hash=await hasher.hash(payload.password),
         role=payload.role,
         department_id=payload.department_id,
     )
@@ -34,20 +54,57 @@ async def create_user(payload: UserCreate, db: AsyncSession = Depends(get_db)):
     return user
 
 
+@router.post(
+    "/import",
+    dependencies=[Depends(require_roles("ADMIN"))],
+)
+async def import_users(
+    uploaded: UploadFile = Upload(...),
+    format: Literal["csv", "ndjson"] | None = None,
+    dry_run: bool = False,
+    hasher: PasswordHasher = Depends(get_hasher),
+):
+    """Create many users from a CSV (with header) or NDJSON file.
+
+    Columns/keys match UserCreate. Streams one NDJSON result per input row;
+    with dry_run nothing is hashed or written.
+    """
+    if format is None:
+        name = (uploaded.filename or "").lower()
+        is_csv = name.endswith(".csv") or uploaded.content_type == "text/csv"
+        format = "csv" if is_csv else "ndjson"
+    try:
+        rows = await asyncio.to_thread(parse_rows, uploaded.file, format)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable file: {e}")
+    return StreamingResponse(
+        run_import(rows, hasher, dry_run), media_type="application/x-ndjson"
+    )
+
+
 @router.get(
     "/",
     response_model=list[UserRead],
     dependencies=[Depends(require_roles("ADMIN", "MANAGER"))],
 )
-async def list_users(db: AsyncSession = Depends(get_db)):
-    res = await db.execute(select(User))
-    return res.scalars().all()
+async def list_users(
+    response: Response,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_read_db),
+):
+    stmt = keyset(select(*columns_for(User, UserRead)), User.id, page)
+    if page.stream:
+        return ndjson_response(stmt, db)
+    res = await db.execute(stmt)
+    rows = finish_page(res.all(), page, response)
+    users = [row._asdict() for row in rows]
+    return ORJSONResponse(users, headers=response.headers)
 
 
 @router.get("/{user_id}", response_model=UserRead)
 async def get_user(
     user_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current=Depends(get_current_user),
 ):
     res = await db.execute(select(User).where(User.id == user_id))
@@ -73,6 +130,7 @@ async def update_role(
         raise HTTPException(status_code=404, detail="User not found")
     user.role = payload.role
     await db.commit()
+    await principal_cache.invalidate(user.username)
     await db.refresh(user)
     return user
 
@@ -83,23 +141,28 @@ async def update_role(
     dependencies=[Depends(require_roles("ADMIN"))],
 )
 async def update_user(
-    user_id: int, payload: UserUpdate, db: AsyncSession = Depends(get_db)
+    user_id: int,
+    payload: UserUpdate,
+    db: AsyncSession = Depends(get_db),
+    hasher: PasswordHasher = Depends(get_hasher),
 ):
     res = await db.execute(select(User).where(User.id == user_id))
     user = res.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    old_username = user.username
     if payload.username:
         user.username = payload.username
     if payload.password:
-        user.password_hash = hash_password(payload.password)
+        user.password_hash = await hasher.hash(payload.password)
     if payload.role:
         user.role = payload.role
     if payload.department_id is not None:
         user.department_id = payload.department_id
 
     await db.commit()
+    await principal_cache.invalidate(old_username)
     await db.refresh(user)
     return user
 
@@ -112,4 +175,5 @@ async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found")
     await db.execute(delete(User).where(User.id == user_id))
     await db.commit()
+    await principal_cache.invalidate(user.username)
     return {"detail": "User deleted"}
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class DepartmentCreate(BaseModel):
@@ -19,3 +19,21 @@ class DepartmentAssignUser(BaseModel):
 
 class DepartmentRemoveUser(BaseModel):
     user_id: int
+
+
+class DepartmentMembers(BaseModel):
+    user_ids: list[int] = Field(min_length=1, max_length=10_000)
+
+
+class DepartmentMove(DepartmentMembers):
+    target_department_id: int
+
+
+class MembershipResult(BaseModel):
+    updated: list[int]
+    skipped: list[int]
+
+
+class MergeResult(BaseModel):
+    users_moved: int
+    files_moved: int
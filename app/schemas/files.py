@@ -1,8 +1,12 @@
+from datetime import datetime
 from typing import Any, Dict, Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 Visibility = Literal["PRIVATE", "DEPARTMENT", "PUBLIC"]
+ProcessingStatus = Literal[
+    "UPLOADING", "PENDING", "PROCESSING", "DONE", "FAILED"
+]
 
 
 class FileCreate(BaseModel):
@@ -16,9 +20,49 @@ class FileRead(BaseModel):
     department_id: Optional[int]
     visibility: Visibility
     meta: Optional[Dict[str, Any]] = None
+    processing_status: ProcessingStatus = "PENDING"
     size: int
     mime_type: str
     download_count: int
+    digest: Optional[str] = None
 
     class Config:
         from_attributes = True
+
+
+class BatchUploadResult(BaseModel):
+    filename: Optional[str]
+    ok: bool
+    status_code: int
+    error: Optional[str] = None
+    file: Optional[FileRead] = None
+
+
+class DirectUploadCreate(BaseModel):
+    filename: str = Field(min_length=1)
+    size: int = Field(gt=0)
+    content_type: str
+    visibility: Visibility = "PRIVATE"
+
+
+class DirectUploadTicket(BaseModel):
+    """POST `fields` plus the file as the last form field `file` to `url`,
+    then call /files/uploads/{file_id}/complete."""
+
+    file_id: int
+    url: str
+    fields: Dict[str, str]
+    expires_at: datetime
+
+
+class ResumableUpload(BaseModel):
+    """PATCH the file to /files/uploads/{file_id} in `chunk_size` pieces
+    (the last may be shorter), each with an Upload-Offset header, then
+    call /files/uploads/{file_id}/complete. HEAD returns the offset to
+    resume from after an interruption."""
+
+    file_id: int
+    size: int
+    offset: int
+    chunk_size: int
+    expires_at: datetime
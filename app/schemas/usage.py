@@ -0,0 +1,13 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class UsageRead(BaseModel):
+    """Storage used by one user or department; `id` is theirs."""
+
+    id: int
+    bytes_used: int
+    file_count: int
+    download_count: int
+    quota_bytes: Optional[int]
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -36,3 +36,11 @@ class UserUpdateRole(BaseModel):
 class TokenOut(BaseModel):
     access_token: str
     token_type: str = "bearer"
+
+
+class UserImportResult(BaseModel):
+    row: int
+    username: Optional[str]
+    status: Literal["created", "valid", "error"]
+    id: Optional[int] = None
+    error: Optional[str] = None
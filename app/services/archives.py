@@ -0,0 +1,68 @@
+import mimetypes
+import os
+import shutil
+import tempfile
+import zipfile
+from typing import BinaryIO
+
+from app.services.storage import LimitedReader, SizeLimitExceeded
+
+ZIP_TYPES = {"application/zip", "application/x-zip-compressed"}
+
+SPOOL_SIZE = 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+
+def unpack_zip(
+    raw: BinaryIO, limit: int, max_members: int, max_total: int
+) -> tuple[list[tuple[str, str, BinaryIO | SizeLimitExceeded]], int]:
+    """Spool each member of a zip archive to its own temp file.
+
+    Returns (filename, content_type, file) per member and the bytes
+    unpacked; members larger than `limit` come back as SizeLimitExceeded
+    instead of a file. More than `max_total` bytes in all is a ValueError,
+    so a small archive cannot fill the temp disk. Sizes are enforced while
+    decompressing, since the declared ones can lie. Blocking: run it off
+    the event loop.
+    """
+    out = []
+    total = 0
+    try:
+        with zipfile.ZipFile(raw) as zf:
+            members = [m for m in zf.infolist() if not m.is_dir()]
+            if len(members) > max_members:
+                raise ValueError(f"archive has more than {max_members} files")
+            for m in members:
+                name = os.path.basename(m.filename)
+                content_type = (
+                    mimetypes.guess_type(name)[0] or "application/octet-stream"
+                )
+                if m.file_size > limit:
+                    out.append((name, content_type, SizeLimitExceeded(m.file_size)))
+                    continue
+                budget = max_total - total
+                if m.file_size > budget:
+                    raise ValueError(f"archive unpacks to more than {max_total} bytes")
+                reader = None
+                spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+                try:
+                    with zf.open(m) as src:
+                        reader = LimitedReader(src, min(limit, budget))
+                        shutil.copyfileobj(reader, spool, CHUNK_SIZE)
+                except SizeLimitExceeded as exc:
+                    spool.close()
+                    if budget < limit:
+                        raise ValueError(
+                            f"archive unpacks to more than {max_total} bytes"
+                        )
+                    out.append((name, content_type, exc))
+                    continue
+                total += reader.size
+                spool.seek(0)
+                out.append((name, content_type, spool))
+    except BaseException:
+        for _, _, f in out:
+            if not isinstance(f, SizeLimitExceeded):
+                f.close()
+        raise
+    return out, total
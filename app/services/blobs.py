@@ -0,0 +1,86 @@
+import hashlib
+from typing import BinaryIO
+
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import upsert
+from app.models import Blob
+from app.services.storage import LimitedReader, StorageService
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def blob_key(digest: str) -> str:
+    return f"blobs/{digest[:2]}/{digest}"
+
+
+def digest_stream(raw: BinaryIO, limit: int) -> tuple[str, int]:
+    """SHA-256 and size of a seekable stream, rewound afterwards.
+
+    Raises SizeLimitExceeded past `limit`, before anything is stored.
+    Blocking: run it off the event loop.
+    """
+    h = hashlib.sha256()
+    reader = LimitedReader(raw, limit)
+    while chunk := reader.read(CHUNK_SIZE):
+        h.update(chunk)
+    raw.seek(0)
+    return h.hexdigest(), reader.size
+
+
+async def acquire_blobs(
+    db: AsyncSession, blobs: dict[str, tuple[int, int]]
+) -> set[str]:
+    """Take references on many blobs in one statement.
+
+    `blobs` maps digest -> (size, references to add). Returns the digests
+    that did not exist yet and so still have to be written to storage.
+    The upsert row locks are held until the caller commits, so concurrent
+    uploads of the same new content wait for the first one instead of
+    writing it twice.
+    """
+    stmt = upsert(db, Blob).values(
+        [
+            {"digest": digest, "size": size, "ref_count": refs}
+            for digest, (size, refs) in blobs.items()
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Blob.digest],
+        set_={"ref_count": Blob.ref_count + stmt.excluded.ref_count},
+    ).returning(Blob.digest, Blob.ref_count)
+    rows = await db.execute(stmt)
+    return {digest for digest, refs in rows if refs == blobs[digest][1]}
+
+
+async def store_blob(
+    db: AsyncSession,
+    storage: StorageService,
+    raw: BinaryIO,
+    digest: str,
+    size: int,
+    content_type: str,
+) -> tuple[str, bool]:
+    """Take a reference on the blob for `digest`, uploading it only if new.
+    Returns the storage key and whether this call stored the object."""
+    key = blob_key(digest)
+    created = bool(await acquire_blobs(db, {digest: (size, 1)}))
+    if created:
+        await storage.put_stream(key, raw, size, content_type)
+    return key, created
+
+
+async def release_blob(db: AsyncSession, digest: str) -> bool:
+    """Drop one reference; True when it was the last and the row is gone."""
+    res = await db.execute(
+        update(Blob)
+        .where(Blob.digest == digest)
+        .values(ref_count=Blob.ref_count - 1)
+        .returning(Blob.ref_count)
+    )
+    remaining = res.scalar_one_or_none()
+    if remaining is None or remaining > 0:
+        return False
+    await db.execute(delete(Blob).where(Blob.digest == digest))
+    return True
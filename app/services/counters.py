@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import uuid
+from collections import Counter
+
+from redis.exceptions import RedisError, ResponseError
+from sqlalchemy import bindparam, func, update
+
+from app.config import settings
+from app.db import async_session_maker
+from app.models import File as FileModel
+from app.services.redis import get_redis
+from app.services.usage import DOWNLOAD_INCREMENTS
+
+logger = logging.getLogger("app")
+
+REDIS_KEY = "downloads:pending"
+
+_files = FileModel.__table__
+_increment = (
+    update(_files)
+    .where(_files.c.id == bindparam("fid"))
+    .values(
+        download_count=func.coalesce(_files.c.download_count, 0)
+        + bindparam("n")
+    )
+)
+
+
+class DownloadCounter:
+    """Coalesces download increments and flushes them in batches.
+
+    Increments accumulate in memory (or in a Redis hash shared by all
+    workers with `use_redis`) and are written every `interval` seconds as
+    one executemany of `download_count = download_count + n`, with the
+    owner's and department's usage totals in the same transaction.
+    """
+
+    def __init__(self, interval: float, use_redis: bool):
+        self.interval = interval
+        self.use_redis = use_redis
+        self._pending: Counter[int] = Counter()
+        self._flushing: Counter[int] = Counter()
+
+    async def incr(self, file_id: int, n: int = 1):
+        if self.use_redis:
+            try:
+                await get_redis().hincrby(REDIS_KEY, str(file_id), n)
+                return
+            except RedisError:
+                logger.warning("Redis unavailable, counting download locally")
+        self._pending[file_id] += n
+
+    async def pending(self, ids: list[int]) -> dict[int, int]:
+        deltas = {i: self._pending[i] + self._flushing[i] for i in ids}
+        if self.use_redis and ids:
+            try:
+                values = await get_redis().hmget(REDIS_KEY, [str(i) for i in ids])
+            except RedisError:
+                values = []
+            for i, v in zip(ids, values):
+                if v:
+                    deltas[i] += int(v)
+        return {i: n for i, n in deltas.items() if n}
+
+    async def apply_rows(self, rows: list[dict]):
+        """Add pending deltas to the download_count of response rows."""
+        deltas = await self.pending([r["id"] for r in rows])
+        for r in rows:
+            if r["id"] in deltas:
+                r["download_count"] = (r["download_count"] or 0) + deltas[r["id"]]
+
+    async def _take_redis(self) -> Counter[int]:
+        # RENAME is atomic, so exactly one worker takes each batch
+        redis = get_redis()
+        batch_key = f"{REDIS_KEY}:{uuid.uuid4().hex}"
+        try:
+            await redis.rename(REDIS_KEY, batch_key)
+        except ResponseError:  # no such key: nothing pending
+            return Counter()
+        raw = await redis.hgetall(batch_key)
+        await redis.delete(batch_key)
+        return Counter({int(k): int(v) for k, v in raw.items()})
+
+    async def flush(self):
+        batch, self._pending = self._pending, Counter()
+        if self.use_redis:
+            try:
+                batch.update(await self._take_redis())
+            except RedisError:
+                logger.warning("Redis unavailable, flushing local counts only")
+        if not batch:
+            return
+        self._flushing = batch
+        try:
+            params = [{"fid": fid, "n": n} for fid, n in sorted(batch.items())]
+            async with async_session_maker() as session:
+                await session.execute(_increment, params)
+                for stmt in DOWNLOAD_INCREMENTS:
+                    await session.execute(stmt, params)
+                await session.commit()
+        except asyncio.CancelledError:
+            # shutdown interrupted the loop; the final flush retries these
+            self._pending.update(batch)
+            raise
+        except Exception:
+            logger.exception("Download count flush failed, will retry")
+            self._pending.update(batch)
+        finally:
+            self._flushing = Counter()
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+
+download_counter = DownloadCounter(
+    settings.DOWNLOAD_FLUSH_INTERVAL, settings.DOWNLOAD_COUNTER_REDIS
+)
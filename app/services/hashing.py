@@ -0,0 +1,123 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.config import settings
+from app.core.metrics import HASH_QUEUE_WAIT
+
+# min == max == default, so any change of BCRYPT_ROUNDS marks existing
+# hashes as needing an update on the next successful login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+
+def _hash(plain: str) -> str:
+    return pwd_context.hash(plain)
+
+
+def _hash_many(passwords: list[str]) -> list[str]:
+    return [pwd_context.hash(p) for p in passwords]
+
+
+def _verify_and_update(plain: str, hashed: str) -> tuple[bool, str | None]:
+    return pwd_context.verify_and_update(plain, hashed)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a process pool so hashing never blocks the event loop.
+
+    At most `max_workers` jobs run at once and up to `queue_size` more may
+    wait for a slot; beyond that callers get a 503 instead of piling up.
+    """
+
+    def __init__(self, max_workers: int, queue_size: int):
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self._executor: ProcessPoolExecutor | None = None
+        self._slots = asyncio.Semaphore(max_workers)
+        self._bulk_slots = asyncio.Semaphore(max_workers)
+        self._pending = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn keeps the workers free of the parent's threads and
+            # only imports this module's light dependencies
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def _submit(self, fn, *args):
+        if self._pending >= self.max_workers + self.queue_size:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Password service is busy, retry later",
+                headers={"Retry-After": "1"},
+            )
+        self._pending += 1
+        queued_at = time.perf_counter()
+        try:
+            async with self._slots:
+                HASH_QUEUE_WAIT.observe(time.perf_counter() - queued_at)
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self._get_executor(), fn, *args
+                )
+        finally:
+            self._pending -= 1
+
+    async def hash(self, plain: str) -> str:
+        return await self._submit(_hash, plain)
+
+    async def hash_many(self, passwords: list[str]) -> list[str]:
+        """Hash a bulk job in chunks spread over all workers.
+
+        Bulk chunks bypass the 503 queue limit and have their own slots, so
+        an interactive call waits behind at most one chunk per worker.
+        """
+        size = settings.HASH_BULK_CHUNK
+        chunks = [passwords[i : i + size] for i in range(0, len(passwords), size)]
+        loop = asyncio.get_running_loop()
+
+        async def run(chunk: list[str]) -> list[str]:
+            async with self._bulk_slots:
+                return await loop.run_in_executor(
+                    self._get_executor(), _hash_many, chunk
+                )
+
+        results = await asyncio.gather(*(run(c) for c in chunks))
+        return [h for chunk in results for h in chunk]
+
+    async def verify(self, plain: str, hashed: str) -> tuple[bool, str | None]:
+        """Return (valid, new_hash); new_hash is set when the stored hash
+        was made with a different cost factor and should be replaced."""
+        return await self._submit(_verify_and_update, plain, hashed)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "pending": self._pending,
+            "queued": max(self._pending - self.max_workers, 0),
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+hasher = PasswordHasher(settings.HASH_WORKERS, settings.HASH_QUEUE_SIZE)
+
+
+def get_hasher() -> PasswordHasher:
+    return hasher
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import logging
+from dataclasses import asdict, dataclass
+
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.models.user import Role
+from app.services.cache import TTLCache
+from app.services.redis import get_redis, get_with_ttl
+
+logger = logging.getLogger("app")
+
+KEY_PREFIX = "principal:"
+CHANNEL = "principal-invalidate"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The slice of a User that authorization needs, cheap to cache."""
+
+    id: int
+    username: str
+    role: Role
+    department_id: int | None
+
+
+class PrincipalCache:
+    """TTL/LRU cache of principals keyed by JWT `sub`.
+
+    The in-process tier is always on. With `use_redis` a shared Redis tier
+    sits behind it and invalidations are published so every worker drops
+    its local copy; the TTL bounds staleness if a message is missed.
+    """
+
+    def __init__(self, ttl: int, max_size: int, use_redis: bool):
+        self.ttl = ttl
+        self.use_redis = use_redis
+        self._local: TTLCache[Principal] = TTLCache(ttl, max_size)
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, sub: str) -> Principal | None:
+        principal = self._local.get(sub)
+        if principal is None and self.use_redis:
+            try:
+                raw, ttl = await get_with_ttl(KEY_PREFIX + sub)
+            except RedisError:
+                raw = None
+            if raw:
+                data = json.loads(raw)
+                principal = Principal(**{**data, "role": Role(data["role"])})
+                # keeps the TTL a bound on staleness across both tiers
+                self._local.set(principal.username, principal, ttl=ttl)
+        if principal is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return principal
+
+    async def set(self, principal: Principal):
+        self._local.set(principal.username, principal)
+        if self.use_redis:
+            data = {**asdict(principal), "role": principal.role.value}
+            try:
+                await get_redis().set(
+                    KEY_PREFIX + principal.username,
+                    json.dumps(data),
+                    ex=self.ttl,
+                )
+            except RedisError:
+                pass
+
+    async def invalidate(self, *subs: str):
+        for sub in subs:
+            self._local.pop(sub)
+        if self.use_redis and subs:
+            try:
+                redis = get_redis()
+                await redis.delete(*(KEY_PREFIX + s for s in subs))
+                await redis.publish(CHANNEL, json.dumps(list(subs)))
+            except RedisError:
+                logger.warning("Principal invalidation not published: %s", subs)
+
+    async def listen(self):
+        """Drop local entries invalidated by other workers."""
+        while True:
+            pubsub = get_redis().pubsub()
+            try:
+                await pubsub.subscribe(CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    for sub in json.loads(message["data"]):
+                        self._local.pop(sub)
+            except asyncio.CancelledError:
+                raise
+            except RedisError:
+                # local entries still expire after `ttl`
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._local),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+principal_cache = PrincipalCache(
+    settings.PRINCIPAL_CACHE_TTL,
+    settings.PRINCIPAL_CACHE_SIZE,
+    settings.PRINCIPAL_CACHE_REDIS,
+)
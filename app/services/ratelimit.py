@@ -0,0 +1,182 @@
+import logging
+import math
+import time
+from dataclasses import dataclass
+
+from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.services.cache import TTLCache
+from app.services.redis import get_redis
+
+logger = logging.getLogger("app")
+
+KEY_PREFIX = "ratelimit:"
+# requests without a valid token, limited per client IP
+ANONYMOUS = "ANONYMOUS"
+
+
+@dataclass(frozen=True)
+class Budget:
+    rate: float  # tokens added per second
+    burst: int  # bucket size: requests allowed at once after a quiet spell
+
+    @property
+    def refill_time(self) -> float:
+        """Seconds for an empty bucket to fill up again."""
+        return self.burst / self.rate
+
+
+# every request takes a token from its caller's overall bucket
+DEFAULT_BUDGETS = {
+    ANONYMOUS: Budget(5, 20),
+    "USER": Budget(20, 60),
+    "MANAGER": Budget(40, 120),
+    "ADMIN": Budget(80, 240),
+}
+# expensive routes also take one from a bucket of their own, by role or
+# "*" for everyone; a role that is not listed has no extra limit there
+ROUTE_BUDGETS: dict[str, dict[str, Budget]] = {
+    # bcrypt: each attempt is a hash worker busy for ~250ms
+    "POST /auth/login": {"*": Budget(0.2, 5)},
+    "POST /files/upload": {
+        "USER": Budget(0.5, 10),
+        "MANAGER": Budget(1, 20),
+        "ADMIN": Budget(2, 40),
+    },
+    "POST /files/upload/batch": {
+        "USER": Budget(0.05, 2),
+        "MANAGER": Budget(0.1, 4),
+        "ADMIN": Budget(0.2, 8),
+    },
+    "POST /users/import": {"ADMIN": Budget(0.01, 2)},
+}
+
+# All buckets of one request are checked and taken atomically: if any is
+# short of a token none is taken, and the longest wait is returned. The
+# clock is the server's, so workers' clocks need not agree.
+TAKE_TOKENS = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local wait, tokens = 0, {}
+for i, key in ipairs(KEYS) do
+    local rate, burst = tonumber(ARGV[2 * i - 1]), tonumber(ARGV[2 * i])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local left = tonumber(bucket[1]) or burst
+    local elapsed = math.max(0, now - (tonumber(bucket[2]) or now))
+    left = math.min(burst, left + elapsed * rate)
+    if left < 1 then
+        wait = math.max(wait, (1 - left) / rate)
+    end
+    tokens[i] = left
+end
+if wait > 0 then
+    return tostring(wait)
+end
+for i, key in ipairs(KEYS) do
+    local rate, burst = tonumber(ARGV[2 * i - 1]), tonumber(ARGV[2 * i])
+    redis.call('HSET', key, 'tokens', tokens[i] - 1, 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil(burst / rate * 1000))
+end
+return '0'
+"""
+
+
+class RateLimiter:
+    """Token buckets per caller, in Redis when `use_redis`.
+
+    Buckets live in Redis so every worker shares them. Without Redis, or
+    for `retry_after` seconds after it fails, each worker keeps its own
+    buckets in memory: limits then apply per worker instead of overall,
+    which still holds back a single noisy client.
+    """
+
+    def __init__(self, use_redis: bool, max_local: int, retry_after: float = 5.0):
+        self.use_redis = use_redis
+        self.retry_after = retry_after
+        # an expired bucket would have refilled anyway
+        self._local: TTLCache[tuple[float, float]] = TTLCache(0, max_local)
+        self._script: AsyncScript | None = None
+        self._redis_down_until = 0.0
+        self.limited = 0
+
+    def budgets(self, route: str, role: str) -> list[tuple[str, Budget]]:
+        """(bucket name, budget) pairs that apply to a request."""
+        found = [("all", DEFAULT_BUDGETS.get(role, DEFAULT_BUDGETS["USER"]))]
+        route_budgets = ROUTE_BUDGETS.get(route, {})
+        budget = route_budgets.get(role, route_budgets.get("*"))
+        if budget is not None:
+            found.append((route, budget))
+        return found
+
+    async def take(self, identity: str, route: str, role: str) -> float:
+        """Take a token from every bucket of the request. Returns 0 if it
+        may go ahead, otherwise the seconds until it could."""
+        buckets = [
+            (f"{KEY_PREFIX}{{{identity}}}:{name}", budget)
+            for name, budget in self.budgets(route, role)
+        ]
+        wait = None
+        if self.use_redis and time.monotonic() >= self._redis_down_until:
+            wait = await self._take_redis(buckets)
+        if wait is None:
+            wait = self._take_local(buckets)
+        if wait:
+            self.limited += 1
+        return wait
+
+    def _script_for(self, redis: Redis) -> AsyncScript:
+        # bound to a client; get_redis() makes a new one after close_redis()
+        if self._script is None or self._script.registered_client is not redis:
+            self._script = redis.register_script(TAKE_TOKENS)
+        return self._script
+
+    async def _take_redis(self, buckets: list[tuple[str, Budget]]) -> float | None:
+        args = []
+        for _, budget in buckets:
+            args += [budget.rate, budget.burst]
+        try:
+            redis = get_redis()
+            wait = await self._script_for(redis)(
+                keys=[key for key, _ in buckets], args=args
+            )
+        except RedisError:
+            logger.warning(
+                "Redis unavailable, rate limiting per worker for %.0fs",
+                self.retry_after,
+            )
+            self._redis_down_until = time.monotonic() + self.retry_after
+            return None
+        return float(wait)
+
+    def _take_local(self, buckets: list[tuple[str, Budget]]) -> float:
+        now = time.monotonic()
+        wait, tokens = 0.0, []
+        for key, budget in buckets:
+            left, ts = self._local.get(key) or (budget.burst, now)
+            left = min(budget.burst, left + (now - ts) * budget.rate)
+            if left < 1:
+                wait = max(wait, (1 - left) / budget.rate)
+            tokens.append(left)
+        if wait:
+            return wait
+        for (key, budget), left in zip(buckets, tokens):
+            self._local.set(key, (left - 1, now), ttl=budget.refill_time)
+        return 0.0
+
+    def stats(self) -> dict:
+        return {
+            "local_buckets": len(self._local),
+            "limited": self.limited,
+            "redis_down": time.monotonic() < self._redis_down_until,
+        }
+
+
+def retry_after(wait: float) -> str:
+    """Retry-After header value: whole seconds, at least one."""
+    return str(max(1, math.ceil(wait)))
+
+
+rate_limiter = RateLimiter(settings.RATE_LIMIT_REDIS, settings.RATE_LIMIT_LOCAL_SIZE)
@@ -0,0 +1,36 @@
+from redis import asyncio as aioredis
+
+from app.config import settings
+
+_client: aioredis.Redis | None = None
+
+
+def get_redis() -> aioredis.Redis:
+    """Shared Redis client for caches and counters (lazily connected)."""
+    global _client
+    if _client is None:
+        _client = aioredis.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            max_connections=settings.REDIS_POOL_SIZE,
+            socket_timeout=settings.REDIS_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_TIMEOUT,
+        )
+    return _client
+
+
+async def close_redis():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def get_with_ttl(key: str) -> tuple[str | None, float]:
+    """Value of `key` and the seconds it has left, in one round trip.
+
+    For copying a shared entry into a local cache without outliving it.
+    """
+    async with get_redis().pipeline(transaction=False) as pipe:
+        value, pttl = await pipe.get(key).pttl(key).execute()
+    return value, max(pttl, 0) / 1000
@@ -0,0 +1,54 @@
+import json
+from typing import Any, Literal
+
+from sqlalchemy import ColumnElement, and_, func, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.models import File
+
+SearchMode = Literal["prefix", "substring"]
+
+
+def _escape_like(q: str) -> str:
+    return q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def filename_clause(q: str, mode: SearchMode) -> ColumnElement[bool]:
+    """Case-insensitive filename match. On PostgreSQL both modes are
+    served by the pg_trgm index ix_files_filename_trgm (for terms of three
+    or more characters); SQLite compares lower() with LIKE."""
+    pattern = _escape_like(q) + "%"
+    if mode == "substring":
+        pattern = "%" + pattern
+    return File.filename.ilike(pattern, escape="\\")
+
+
+def _leaves(match: dict, path: tuple[str, ...] = ()):
+    for key, value in match.items():
+        if isinstance(value, dict):
+            yield from _leaves(value, path + (key,))
+        else:
+            yield path + (key,), value
+
+
+def meta_clause(dialect: str, match: dict[str, Any]) -> ColumnElement[bool]:
+    """Files whose meta contains `match`, e.g. {"format": "PNG"}.
+
+    PostgreSQL uses JSONB containment (@>) on the GIN index ix_files_meta.
+    SQLite compares every leaf of `match` with json_extract; arrays are
+    not supported there and a null leaf also matches a missing key.
+    """
+    if dialect == "postgresql":
+        return type_coerce(File.meta, JSONB).contains(match)
+
+    clauses = []
+    for path, value in _leaves(match):
+        if isinstance(value, list):
+            raise ValueError("Matching arrays in meta needs PostgreSQL")
+        extracted = func.json_extract(
+            File.meta, "$." + ".".join(json.dumps(k) for k in path)
+        )
+        clauses.append(
+            extracted.is_(None) if value is None else extracted == value
+        )
+    return and_(*clauses)
@@ -1,18 +1,433 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO
+from urllib.parse import quote
+
+import urllib3
 from minio import Minio
+from minio.datatypes import Part, PostPolicy
+from minio.error import S3Error
 
 from app.config import settings
+from app.core.metrics import STORAGE_LATENCY
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class SizeLimitExceeded(Exception):
+    pass
+
+
+class LimitedReader:
+    """File-like wrapper that counts bytes and fails once `limit` is crossed."""
+
+    def __init__(self, raw: BinaryIO, limit: int):
+        self._raw = raw
+        self.limit = limit
+        self.size = 0
+
+    def read(self, n: int = -1) -> bytes:
+        chunk = self._raw.read(n)
+        self.size += len(chunk)
+        if self.size > self.limit:
+            raise SizeLimitExceeded(self.size)
+        return chunk
 
 
 def get_minio() -> Minio:
+    http_client = urllib3.PoolManager(
+        maxsize=settings.S3_POOL_SIZE,
+        block=True,
+        timeout=urllib3.Timeout(connect=5, read=60),
+        retries=urllib3.Retry(
+            total=3,
+            backoff_factor=0.2,
+            status_forcelist=[500, 502, 503, 504],
+        ),
+    )
     return Minio(
         settings.S3_ENDPOINT.replace("http://", "").replace("https://", ""),
         access_key=settings.S3_ACCESS_KEY,
         secret_key=settings.S3_SECRET_KEY,
         secure=settings.S3_ENDPOINT.startswith("https://"),
+        http_client=http_client,
     )
 
 
-def ensure_bucket(client: Minio, bucket: str):
-    found = client.bucket_exists(bucket)
-    if not found:
-        client.make_bucket(bucket)
+class StorageService:
+    """Storage backend interface.
+
+    Blocking backend calls run on a bounded thread pool, so a slow round
+    trip or disk never stalls the event loop.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="storage"
+        )
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._active = 0
+
+    async def _run(self, fn, *args, **kwargs):
+        def call():
+            with self._lock:
+                self._active += 1
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                STORAGE_LATENCY.labels(fn.__name__).observe(
+                    time.perf_counter() - start
+                )
+                with self._lock:
+                    self._active -= 1
+
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, call)
+        finally:
+            self._in_flight -= 1
+
+    async def ensure_bucket(self):
+        """Prepare the backend. Called once at startup."""
+        raise NotImplementedError
+
+    async def put_stream(
+        self,
+        object_name: str,
+        raw: BinaryIO,
+        limit: int,
+        content_type: str,
+    ) -> int:
+        """Store `raw` under `object_name` without holding it in memory.
+
+        If the stream grows past `limit`, SizeLimitExceeded is raised and
+        nothing is left behind. Returns the number of bytes stored.
+        """
+        raise NotImplementedError
+
+    async def presigned_get(
+        self, object_name: str, filename: str | None = None
+    ) -> str | None:
+        """Signed URL to fetch the object directly, or None when the API
+        itself has to serve it (see local_path)."""
+        return None
+
+    async def presigned_post(
+        self, object_name: str, content_type: str, size: int
+    ) -> tuple[str, dict[str, str]] | None:
+        """URL and form fields for a browser-style POST upload of exactly
+        `size` bytes, or None when the backend has no direct uploads."""
+        return None
+
+    async def stat(self, object_name: str) -> tuple[int, str | None] | None:
+        """(size, content type) of a stored object, None if it is missing."""
+        raise NotImplementedError
+
+    async def remove(self, object_name: str):
+        raise NotImplementedError
+
+    # multipart uploads, assembled from parts sent in separate requests
+    async def create_multipart(self, object_name: str, content_type: str) -> str:
+        """Start a multipart upload and return its id."""
+        raise NotImplementedError
+
+    async def upload_part(
+        self, object_name: str, upload_id: str, part_number: int, data: bytes
+    ) -> str:
+        """Store part `part_number` (from 1), replacing an earlier copy.
+        Returns its ETag."""
+        raise NotImplementedError
+
+    async def complete_multipart(
+        self, object_name: str, upload_id: str, etags: list[str]
+    ):
+        """Join parts 1..len(etags) into the object."""
+        raise NotImplementedError
+
+    async def abort_multipart(self, object_name: str, upload_id: str):
+        raise NotImplementedError
+
+    def local_path(self, object_name: str) -> str | None:
+        """Path of the object on this host, for backends that keep one."""
+        return None
+
+    def download_to(self, object_name: str, path: str):
+        """Copy the object to a local file. Blocking, for workers."""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        active = self._active
+        return {
+            "workers": self.max_workers,
+            "active": active,
+            "queued": max(self._in_flight - active, 0),
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class MinioStorage(StorageService):
+    """One shared minio client with a sized connection pool."""
+
+    def __init__(self, bucket: str, max_workers: int):
+        super().__init__(max_workers)
+        self.bucket = bucket
+        self.client = get_minio()
+
+    async def ensure_bucket(self):
+        found = await self._run(self.client.bucket_exists, self.bucket)
+        if not found:
+            await self._run(self.client.make_bucket, self.bucket)
+
+    async def put_stream(
+        self,
+        object_name: str,
+        raw: BinaryIO,
+        limit: int,
+        content_type: str,
+    ) -> int:
+        # a multipart upload, one UPLOAD_PART_SIZE part in memory at a
+        # time; minio aborts it when the reader raises SizeLimitExceeded
+        reader = LimitedReader(raw, limit)
+        await self._run(
+            self.client.put_object,
+            self.bucket,
+            object_name,
+            reader,
+            length=-1,
+            part_size=settings.UPLOAD_PART_SIZE,
+            content_type=content_type,
+        )
+        return reader.size
+
+    async def presigned_get(
+        self, object_name: str, filename: str | None = None
+    ) -> str:
+        # `filename` sets the name the client saves as, since
+        # content-addressed keys carry no name of their own
+        response_headers = None
+        if filename:
+            response_headers = {
+                "response-content-disposition": (
+                    f"attachment; filename*=UTF-8''{quote(filename)}"
+                )
+            }
+        return await self._run(
+            self.client.presigned_get_object,
+            self.bucket,
+            object_name,
+            expires=timedelta(seconds=settings.PRESIGNED_URL_EXPIRE),
+            response_headers=response_headers,
+        )
+
+    async def presigned_post(
+        self, object_name: str, content_type: str, size: int
+    ) -> tuple[str, dict[str, str]]:
+        # the policy pins key, type and length, so the client can upload
+        # only the object that was reserved
+        expires = datetime.now(timezone.utc) + timedelta(
+            seconds=settings.DIRECT_UPLOAD_EXPIRE
+        )
+        policy = PostPolicy(self.bucket, expires)
+        policy.add_equals_condition("key", object_name)
+        policy.add_equals_condition("Content-Type", content_type)
+        policy.add_content_length_range_condition(size, size)
+        fields = await self._run(self.client.presigned_post_policy, policy)
+        fields.update({"key": object_name, "Content-Type": content_type})
+        return f"{settings.S3_ENDPOINT.rstrip('/')}/{self.bucket}", fields
+
+    def _stat(self, object_name: str) -> tuple[int, str | None] | None:
+        try:
+            obj = self.client.stat_object(self.bucket, object_name)
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                return None
+            raise
+        return obj.size, obj.content_type
+
+    async def stat(self, object_name: str) -> tuple[int, str | None] | None:
+        return await self._run(self._stat, object_name)
+
+    async def remove(self, object_name: str):
+        await self._run(self.client.remove_object, self.bucket, object_name)
+
+    # minio-py only exposes the multipart calls as private methods; they
+    # map one-to-one onto the S3 API
+    async def create_multipart(self, object_name: str, content_type: str) -> str:
+        return await self._run(
+            self.client._create_multipart_upload,
+            self.bucket,
+            object_name,
+            {"Content-Type": content_type},
+        )
+
+    async def upload_part(
+        self, object_name: str, upload_id: str, part_number: int, data: bytes
+    ) -> str:
+        return await self._run(
+            self.client._upload_part,
+            self.bucket,
+            object_name,
+            data,
+            None,
+            upload_id,
+            part_number,
+        )
+
+    async def complete_multipart(
+        self, object_name: str, upload_id: str, etags: list[str]
+    ):
+        parts = [Part(n, etag) for n, etag in enumerate(etags, start=1)]
+        await self._run(
+            self.client._complete_multipart_upload,
+            self.bucket,
+            object_name,
+            upload_id,
+            parts,
+        )
+
+    async def abort_multipart(self, object_name: str, upload_id: str):
+        await self._run(
+            self.client._abort_multipart_upload,
+            self.bucket,
+            object_name,
+            upload_id,
+        )
+
+    def download_to(self, object_name: str, path: str):
+        self.client.fget_object(self.bucket, object_name, path)
+
+
+class LocalStorage(StorageService):
+    """Objects as plain files under `root`; the API serves them itself."""
+
+    def __init__(self, root: str, max_workers: int):
+        super().__init__(max_workers)
+        self.root = os.path.abspath(root)
+
+    def local_path(self, object_name: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, object_name))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Object name outside storage root: {object_name}")
+        return path
+
+    async def ensure_bucket(self):
+        await self._run(os.makedirs, self.root, exist_ok=True)
+
+    def _write(self, object_name: str, raw: BinaryIO, limit: int) -> int:
+        path = self.local_path(object_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write beside the target and rename: readers never see a partial
+        # object and a failed upload leaves nothing behind
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        reader = LimitedReader(raw, limit)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                shutil.copyfileobj(reader, out, CHUNK_SIZE)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return reader.size
+
+    async def put_stream(
+        self,
+        object_name: str,
+        raw: BinaryIO,
+        limit: int,
+        content_type: str,
+    ) -> int:
+        return await self._run(self._write, object_name, raw, limit)
+
+    def _stat(self, object_name: str) -> tuple[int, None] | None:
+        try:
+            return os.stat(self.local_path(object_name)).st_size, None
+        except FileNotFoundError:
+            return None
+
+    async def stat(self, object_name: str) -> tuple[int, None] | None:
+        return await self._run(self._stat, object_name)
+
+    def _remove(self, object_name: str):
+        try:
+            os.remove(self.local_path(object_name))
+        except FileNotFoundError:
+            pass
+
+    async def remove(self, object_name: str):
+        await self._run(self._remove, object_name)
+
+    def _parts_dir(self, upload_id: str) -> str:
+        return self.local_path(f".multipart/{upload_id}")
+
+    def _write_part(self, upload_id: str, part_number: int, data: bytes) -> str:
+        path = os.path.join(self._parts_dir(upload_id), str(part_number))
+        with open(f"{path}.part", "wb") as out:
+            out.write(data)
+        os.replace(f"{path}.part", path)
+        return hashlib.md5(data).hexdigest()
+
+    def _join_parts(self, object_name: str, upload_id: str, count: int):
+        parts = self._parts_dir(upload_id)
+        path = self.local_path(object_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for n in range(1, count + 1):
+                    with open(os.path.join(parts, str(n)), "rb") as part:
+                        shutil.copyfileobj(part, out, CHUNK_SIZE)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        shutil.rmtree(parts, ignore_errors=True)
+
+    async def create_multipart(self, object_name: str, content_type: str) -> str:
+        upload_id = uuid.uuid4().hex
+        await self._run(os.makedirs, self._parts_dir(upload_id))
+        return upload_id
+
+    async def upload_part(
+        self, object_name: str, upload_id: str, part_number: int, data: bytes
+    ) -> str:
+        return await self._run(self._write_part, upload_id, part_number, data)
+
+    async def complete_multipart(
+        self, object_name: str, upload_id: str, etags: list[str]
+    ):
+        await self._run(self._join_parts, object_name, upload_id, len(etags))
+
+    async def abort_multipart(self, object_name: str, upload_id: str):
+        await self._run(
+            shutil.rmtree, self._parts_dir(upload_id), ignore_errors=True
+        )
+
+    def download_to(self, object_name: str, path: str):
+        shutil.copyfile(self.local_path(object_name), path)
+
+
+def build_storage() -> StorageService:
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorage(settings.LOCAL_STORAGE_ROOT, settings.S3_MAX_WORKERS)
+    return MinioStorage(settings.S3_BUCKET, settings.S3_MAX_WORKERS)
+
+
+storage = build_storage()
+
+
+def get_storage() -> StorageService:
+    return storage
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import AsyncIterator
+
+from sqlalchemy import delete, select
+
+from app.db import async_session_maker
+from app.models import File as FileModel
+from app.models import ProcessingStatus, UploadSession
+from app.services.storage import SizeLimitExceeded, StorageService
+from app.services.usage import USAGE_COLUMNS, release_usage
+
+logger = logging.getLogger("app")
+
+
+def upload_key() -> str:
+    """Storage key for a direct upload. The content is not known when the
+    row is reserved, so these objects are not content-addressed."""
+    return f"uploads/{uuid.uuid4().hex}"
+
+
+async def read_chunk(stream: AsyncIterator[bytes], limit: int) -> bytes:
+    """Collect a request body of at most `limit` bytes."""
+    buf = bytearray()
+    async for piece in stream:
+        buf += piece
+        if len(buf) > limit:
+            raise SizeLimitExceeded(len(buf))
+    return bytes(buf)
+
+
+async def discard_upload(
+    storage: StorageService, key: str, upload_id: str | None
+):
+    """Remove whatever an unfinished upload left in storage."""
+    try:
+        if upload_id is None:
+            await storage.remove(key)
+        else:
+            await storage.abort_multipart(key, upload_id)
+    except Exception:
+        logger.exception("Could not remove abandoned upload %s", key)
+
+
+async def reap_expired(storage: StorageService) -> int:
+    """Drop reservations whose upload was never completed, and any object
+    or multipart parts the client did manage to upload for them.
+
+    The DELETEs only match rows still UPLOADING, so a completion that
+    commits first wins and several workers can reap concurrently. The
+    reserved sizes are taken off the usage counters.
+    """
+    expired = (
+        FileModel.processing_status == ProcessingStatus.UPLOADING,
+        FileModel.upload_expires_at < datetime.now(timezone.utc),
+    )
+    async with async_session_maker() as session:
+        res = await session.execute(
+            delete(UploadSession)
+            .where(UploadSession.file_id.in_(select(FileModel.id).where(*expired)))
+            .returning(UploadSession.file_id, UploadSession.upload_id)
+        )
+        upload_ids = dict(res.all())
+        res = await session.execute(
+            delete(FileModel)
+            .where(*expired)
+            .returning(FileModel.id, FileModel.storage_key, *USAGE_COLUMNS)
+        )
+        reaped = res.all()
+        await release_usage(session, reaped)
+        await session.commit()
+
+    for f in reaped:
+        await discard_upload(storage, f.storage_key, upload_ids.get(f.id))
+    return len(reaped)
+
+
+async def run_reaper(storage: StorageService, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            reaped = await reap_expired(storage)
+        except Exception:
+            logger.exception("Upload reaper failed, will retry")
+            continue
+        if reaped:
+            logger.info("Reaped %d abandoned uploads", reaped)
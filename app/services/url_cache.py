@@ -0,0 +1,68 @@
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.services.cache import TTLCache
+from app.services.redis import get_redis, get_with_ttl
+
+KEY_PREFIX = "presigned:"
+
+# entries must die well before the URL they hold stops working
+SAFETY_MARGIN = 60
+
+
+class PresignedUrlCache:
+    """Presigned download URLs keyed by object key and download name.
+
+    Objects are content-addressed, so the content behind a key never
+    changes and uploads leave the cache alone. Entries are evicted when
+    their file is deleted and otherwise expire before the URL does.
+    """
+
+    def __init__(self, ttl: int, max_size: int, use_redis: bool):
+        self.ttl = min(ttl, settings.PRESIGNED_URL_EXPIRE - SAFETY_MARGIN)
+        self.use_redis = use_redis
+        self._local: TTLCache[str] = TTLCache(self.ttl, max_size)
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> str | None:
+        url = self._local.get(key)
+        if url is None and self.use_redis:
+            try:
+                url, ttl = await get_with_ttl(KEY_PREFIX + key)
+            except RedisError:
+                url = None
+            if url:
+                # no longer than Redis keeps it, or the URL could expire first
+                self._local.set(key, url, ttl=ttl)
+        if url is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return url
+
+    async def set(self, key: str, url: str):
+        self._local.set(key, url)
+        if self.use_redis:
+            try:
+                await get_redis().set(KEY_PREFIX + key, url, ex=self.ttl)
+            except RedisError:
+                pass
+
+    async def evict(self, key: str):
+        self._local.pop(key)
+        if self.use_redis:
+            try:
+                await get_redis().delete(KEY_PREFIX + key)
+            except RedisError:
+                pass
+
+    def stats(self) -> dict:
+        return {"size": len(self._local), "hits": self.hits, "misses": self.misses}
+
+
+url_cache = PresignedUrlCache(
+    settings.PRESIGNED_URL_CACHE_TTL,
+    settings.PRESIGNED_URL_CACHE_SIZE,
+    settings.PRESIGNED_URL_CACHE_REDIS,
+)
@@ -0,0 +1,236 @@
+from collections import Counter
+
+from sqlalchemy import bindparam, delete, func, insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import upsert
+from app.models import DepartmentUsage, UserUsage
+from app.models import File as FileModel
+
+_files = FileModel.__table__
+_users = UserUsage.__table__
+_departments = DepartmentUsage.__table__
+
+# (table, its key column, the files column it aggregates by)
+SCOPES = (
+    (_users, _users.c.user_id, _files.c.owner_id),
+    (_departments, _departments.c.department_id, _files.c.department_id),
+)
+ZERO = (0, 0, 0)
+# what release_usage needs of a deleted file, for DELETE ... RETURNING
+USAGE_COLUMNS = (
+    FileModel.owner_id,
+    FileModel.department_id,
+    FileModel.size,
+    FileModel.download_count,
+)
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, scope: str):
+        super().__init__(f"Storage quota exceeded for your {scope}")
+        self.scope = scope
+
+
+def _release(table, key):
+    return (
+        update(table)
+        .where(key == bindparam("key"))
+        .values(
+            bytes_used=table.c.bytes_used - bindparam("nbytes"),
+            file_count=table.c.file_count - bindparam("nfiles"),
+            download_count=table.c.download_count - bindparam("ndownloads"),
+        )
+    )
+
+
+def _downloads(table, key, group):
+    return (
+        update(table)
+        .where(
+            key
+            == select(group).where(_files.c.id == bindparam("fid")).scalar_subquery()
+        )
+        .values(download_count=table.c.download_count + bindparam("n"))
+    )
+
+
+_RELEASE = [(_release(table, key), group) for table, key, group in SCOPES]
+# executemany'd by DownloadCounter.flush with the same {fid, n} params as
+# its files update; a file deleted meanwhile matches no usage row
+DOWNLOAD_INCREMENTS = [_downloads(*scope) for scope in SCOPES]
+
+
+async def _add(
+    db: AsyncSession,
+    model,
+    key_value: int,
+    nbytes: int,
+    nfiles: int,
+    ndownloads: int = 0,
+    limit: int = 0,
+) -> bool:
+    """Add to one usage row, creating it if needed. With a `limit` the
+    row is only changed if bytes_used stays within it; False if not."""
+    if limit and nbytes > limit:
+        return False
+    table = model.__table__
+    key = table.primary_key.columns.values()[0]
+    stmt = upsert(db, model).values(
+        {
+            key.key: key_value,
+            "bytes_used": nbytes,
+            "file_count": nfiles,
+            "download_count": ndownloads,
+        }
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={
+            "bytes_used": table.c.bytes_used + stmt.excluded.bytes_used,
+            "file_count": table.c.file_count + stmt.excluded.file_count,
+            "download_count": table.c.download_count
+            + stmt.excluded.download_count,
+        },
+        where=(
+            table.c.bytes_used + stmt.excluded.bytes_used <= limit
+            if limit
+            else None
+        ),
+    ).returning(key)
+    return (await db.execute(stmt)).first() is not None
+
+
+async def remaining_quota(
+    db: AsyncSession, owner_id: int, department_id: int | None
+) -> int | None:
+    """Bytes `owner_id` may still upload, None without a limit. Two
+    primary key reads: a cheap early answer before any storage work;
+    `charge_usage` is what enforces it."""
+    remaining = []
+    if settings.USER_QUOTA_BYTES:
+        used = await db.scalar(
+            select(UserUsage.bytes_used).where(UserUsage.user_id == owner_id)
+        )
+        remaining.append(settings.USER_QUOTA_BYTES - (used or 0))
+    if settings.DEPARTMENT_QUOTA_BYTES and department_id is not None:
+        used = await db.scalar(
+            select(DepartmentUsage.bytes_used).where(
+                DepartmentUsage.department_id == department_id
+            )
+        )
+        remaining.append(settings.DEPARTMENT_QUOTA_BYTES - (used or 0))
+    return max(min(remaining), 0) if remaining else None
+
+
+async def charge_usage(
+    db: AsyncSession,
+    owner_id: int,
+    department_id: int | None,
+    nbytes: int,
+    nfiles: int = 1,
+):
+    """Count new files against their owner and department.
+
+    One conditional upsert per row, so the quota holds under concurrent
+    uploads without aggregating `files`. The rows stay locked until the
+    caller commits: call this last, right before the commit. Raises
+    QuotaExceeded, after which the caller must roll back.
+    """
+    if not await _add(
+        db, UserUsage, owner_id, nbytes, nfiles, limit=settings.USER_QUOTA_BYTES
+    ):
+        raise QuotaExceeded("user")
+    if department_id is not None and not await _add(
+        db,
+        DepartmentUsage,
+        department_id,
+        nbytes,
+        nfiles,
+        limit=settings.DEPARTMENT_QUOTA_BYTES,
+    ):
+        raise QuotaExceeded("department")
+
+
+async def release_usage(db: AsyncSession, files: list):
+    """Take deleted files off the counters.
+
+    `files` are rows with the USAGE_COLUMNS, e.g. from DELETE ...
+    RETURNING; run it in the transaction that deletes them.
+    """
+    for stmt, group in _RELEASE:
+        deltas: dict[int, Counter] = {}
+        for f in files:
+            key = getattr(f, group.key)
+            if key is not None:
+                deltas.setdefault(key, Counter()).update(
+                    nbytes=f.size, nfiles=1, ndownloads=f.download_count or 0
+                )
+        if deltas:
+            await db.execute(
+                stmt, [{"key": key, **d} for key, d in sorted(deltas.items())]
+            )
+
+
+async def move_department_usage(db: AsyncSession, source: int, target: int):
+    """Hand the counters of `source` to `target`, for merged departments."""
+    res = await db.execute(
+        delete(DepartmentUsage)
+        .where(DepartmentUsage.department_id == source)
+        .returning(
+            DepartmentUsage.bytes_used,
+            DepartmentUsage.file_count,
+            DepartmentUsage.download_count,
+        )
+    )
+    row = res.one_or_none()
+    if row is not None:
+        await _add(db, DepartmentUsage, target, *row)
+
+
+async def reconcile_usage(db: AsyncSession) -> dict[str, int]:
+    """Rebuild every usage row from `files` and commit.
+
+    Returns, per table, how many rows were wrong. On PostgreSQL the
+    tables are locked against writers first: uploads and deletes that
+    have not charged yet wait and then apply on top of the rebuilt rows.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        await db.execute(
+            text("LOCK TABLE user_usage, department_usage IN EXCLUSIVE MODE")
+        )
+    drift = {}
+    for table, key, group in SCOPES:
+        before = {row[0]: tuple(row[1:]) for row in await db.execute(select(table))}
+        actual = await db.execute(
+            select(
+                group,
+                func.sum(_files.c.size),
+                func.count(),
+                func.sum(func.coalesce(_files.c.download_count, 0)),
+            )
+            .where(group.is_not(None))
+            .group_by(group)
+        )
+        after = {row[0]: tuple(row[1:]) for row in actual}
+        await db.execute(delete(table))
+        if after:
+            await db.execute(
+                insert(table),
+                [
+                    {
+                        key.key: k,
+                        "bytes_used": nbytes,
+                        "file_count": nfiles,
+                        "download_count": ndownloads,
+                    }
+                    for k, (nbytes, nfiles, ndownloads) in after.items()
+                ],
+            )
+        drift[table.name] = sum(
+            before.get(k, ZERO) != after.get(k, ZERO)
+            for k in before.keys() | after.keys()
+        )
+    await db.commit()
+    return drift
@@ -0,0 +1,149 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, BinaryIO
+
+from pydantic import ValidationError
+from sqlalchemy import select
+
+from app.config import settings
+from app.db import async_session_maker, upsert
+from app.models import Department, User
+from app.schemas.users import UserCreate, UserImportResult
+from app.services.hashing import PasswordHasher
+
+
+def parse_rows(raw: BinaryIO, fmt: str) -> list[dict | str]:
+    """Read CSV (with a header row) or NDJSON into one dict per row, or an
+    error message for rows that cannot be parsed. Blocking."""
+    text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        return [
+            {k: v for k, v in row.items() if v not in ("", None)}
+            for row in csv.DictReader(text)
+        ]
+    rows: list[dict | str] = []
+    for line in text:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            rows.append(f"Invalid JSON: {e.msg}")
+            continue
+        rows.append(row if isinstance(row, dict) else "Expected an object")
+    return rows
+
+
+def _validate(rows: list[dict | str]) -> list[UserCreate | str]:
+    seen: set[str] = set()
+    out: list[UserCreate | str] = []
+    for row in rows:
+        if isinstance(row, str):
+            out.append(row)
+            continue
+        try:
+            user = UserCreate.model_validate(row)
+        except ValidationError as e:
+            out.append("; ".join(err["msg"] for err in e.errors()))
+            continue
+        if user.username in seen:
+            out.append("Duplicate username in import")
+            continue
+        seen.add(user.username)
+        out.append(user)
+    return out
+
+
+async def run_import(
+    rows: list[dict | str], hasher: PasswordHasher, dry_run: bool
+) -> AsyncIterator[str]:
+    """Validate and insert users, yielding one NDJSON result per row.
+
+    Username and department checks are one set-based query each; rows are
+    then hashed in parallel and inserted IMPORT_BATCH_SIZE at a time with
+    a multi-row INSERT ... ON CONFLICT DO NOTHING.
+    """
+    parsed = _validate(rows)
+    users = [u for u in parsed if isinstance(u, UserCreate)]
+
+    async with async_session_maker() as session:
+        taken = set(
+            (
+                await session.execute(
+                    select(User.username).where(
+                        User.username.in_([u.username for u in users])
+                    )
+                )
+            ).scalars()
+        )
+        dept_ids = {u.department_id for u in users if u.department_id}
+        known_depts = set(
+            (
+                await session.execute(
+                    select(Department.id).where(Department.id.in_(dept_ids))
+                )
+            ).scalars()
+        )
+
+        def error(n: int, username: str | None, msg: str) -> str:
+            return UserImportResult(
+                row=n, username=username, status="error", error=msg
+            ).model_dump_json()
+
+        checked: list[tuple[int, UserCreate | str]] = []
+        for n, u in enumerate(parsed, start=1):
+            if isinstance(u, UserCreate):
+                if u.username in taken:
+                    u = "Username already exists"
+                elif u.department_id and u.department_id not in known_depts:
+                    u = "Department not found"
+            checked.append((n, u))
+
+        size = settings.IMPORT_BATCH_SIZE
+        for start in range(0, len(checked), size):
+            batch = checked[start : start + size]
+            valid = [(n, u) for n, u in batch if isinstance(u, UserCreate)]
+            created: dict[str, int] = {}
+            if valid and not dry_run:
+                hashes = await hasher.hash_many([u.password for _, u in valid])
+                stmt = (
+                    upsert(session, User)
+                    .values(
+                        [
+                            {
+                                "username": u.username,
+                                "password_hash": h,
+                                "role": u.role,
+                                "department_id": u.department_id,
+                            }
+                            for (_, u), h in zip(valid, hashes)
+                        ]
+                    )
+                    .on_conflict_do_nothing(index_elements=[User.username])
+                    .returning(User.id, User.username)
+                )
+                created = {
+                    name: uid for uid, name in await session.execute(stmt)
+                }
+                await session.commit()
+
+            for n, u in batch:
+                if isinstance(u, str):
+                    raw = rows[n - 1]
+                    name = raw.get("username") if isinstance(raw, dict) else None
+                    yield error(n, name and str(name), u) + "\n"
+                elif dry_run:
+                    yield UserImportResult(
+                        row=n, username=u.username, status="valid"
+                    ).model_dump_json() + "\n"
+                elif u.username in created:
+                    yield UserImportResult(
+                        row=n,
+                        username=u.username,
+                        status="created",
+                        id=created[u.username],
+                    ).model_dump_json() + "\n"
+                else:
+                    # inserted concurrently since the conflict check
+                    yield error(n, u.username, "Username already exists") + "\n"
@@ -0,0 +1,124 @@
+import hashlib
+import os
+import tempfile
+
+from PIL import Image
+from pypdf import PdfReader
+from sqlalchemy import URL, create_engine, make_url, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import File as FileModel
+from app.models import ProcessingStatus
+from app.services.storage import storage
+from app.worker import celery_app
+
+CHUNK_SIZE = 1024 * 1024
+# workers are plain sync processes: the sync driver for each async one
+SYNC_DRIVERS = {"asyncpg": "psycopg2", "aiosqlite": "pysqlite"}
+
+_engine = None
+
+
+def sync_url(url: str) -> URL:
+    url = make_url(url)
+    driver = SYNC_DRIVERS.get(url.get_driver_name())
+    if driver is None:
+        return url
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}")
+
+
+def _session() -> Session:
+    global _engine
+    if _engine is None:
+        _engine = create_engine(sync_url(settings.DATABASE_URL), pool_pre_ping=True)
+    return Session(_engine)
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        while chunk := fh.read(CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _pdf_meta(path: str) -> dict:
+    reader = PdfReader(path)
+    info = reader.metadata
+    text = reader.pages[0].extract_text() if reader.pages else ""
+    return {
+        "pages": len(reader.pages),
+        "title": info.title if info else None,
+        "snippet": (text or "")[: settings.METADATA_SNIPPET_CHARS].strip(),
+    }
+
+
+def _image_meta(path: str) -> dict:
+    # only the header is read; pixels are never decoded
+    with Image.open(path) as img:
+        return {"width": img.width, "height": img.height, "format": img.format}
+
+
+def extract(path: str, mime_type: str) -> dict:
+    meta = {"sha256": _sha256(path)}
+    if mime_type == "application/pdf":
+        meta.update(_pdf_meta(path))
+    elif mime_type.startswith("image/"):
+        meta.update(_image_meta(path))
+    return meta
+
+
+@celery_app.task(bind=True, max_retries=settings.METADATA_MAX_RETRIES)
+def extract_metadata(self, file_id: int):
+    """Fill File.meta for an uploaded file.
+
+    Safe to run more than once: finished files are skipped, and a file
+    whose content was already processed under another row copies its
+    metadata instead of downloading the object again.
+    """
+    with _session() as session:
+        f = session.get(FileModel, file_id)
+        if f is None or f.processing_status in (
+            ProcessingStatus.DONE,
+            ProcessingStatus.FAILED,
+        ):
+            return
+
+        if f.digest:
+            twin = session.execute(
+                select(FileModel.meta).where(
+                    FileModel.digest == f.digest,
+                    FileModel.id != f.id,
+                    FileModel.processing_status == ProcessingStatus.DONE,
+                )
+            ).first()
+            if twin:
+                f.meta = twin.meta
+                f.processing_status = ProcessingStatus.DONE
+                session.commit()
+                return
+
+        f.processing_status = ProcessingStatus.PROCESSING
+        session.commit()
+
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "object")
+                storage.download_to(f.storage_key, path)
+                try:
+                    meta = extract(path, f.mime_type)
+                    status = ProcessingStatus.DONE
+                except Exception as exc:
+                    # malformed content will not get better on retry
+                    meta = {"error": str(exc)}
+                    status = ProcessingStatus.FAILED
+        except Exception as exc:
+            if self.request.retries < self.max_retries:
+                raise self.retry(exc=exc, countdown=2**self.request.retries)
+            meta = {"error": f"Storage error: {exc}"}
+            status = ProcessingStatus.FAILED
+
+        f.meta = {**(f.meta or {}), **meta}
+        f.processing_status = status
+        session.commit()
@@ -0,0 +1,21 @@
+from celery import Celery
+
+from app.config import settings
+
+celery_app = Celery(
+    "app",
+    broker=settings.CELERY_BROKER_URL or settings.REDIS_URL,
+    include=["app.tasks"],
+)
+
+celery_app.conf.update(
+    # CELERY_EAGER runs tasks inline, for local runs without a broker
+    task_always_eager=settings.CELERY_EAGER,
+    task_ignore_result=True,
+    # a task is only acked once it finished, so a killed worker's job is
+    # redelivered; the tasks are idempotent for that reason
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    worker_concurrency=settings.METADATA_WORKERS,
+)
@@ -0,0 +1,31 @@
+"""The API wired to local stand-ins: SQLite (unless DB_URL says otherwise),
+in-memory object storage, no metadata queue and no rate limits.
+
+Import this instead of app.main, before anything else from `app`:
+
+    uvicorn bench.app:app
+"""
+import os
+
+os.environ.setdefault("DB_URL", "sqlite+aiosqlite:///./bench.db")
+# a load generator is one very busy caller
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from app.services import storage as storage_module  # noqa: E402
+from bench.fakes import InMemoryStorage  # noqa: E402
+
+fake_storage = InMemoryStorage(
+    latency=float(os.environ.get("BENCH_STORAGE_LATENCY", "0.005"))
+)
+# app.main and get_storage() pick the singleton up from this module
+storage_module.storage = fake_storage
+
+from app.main import app  # noqa: E402,F401
+from app.routers import files  # noqa: E402
+
+
+async def _skip_metadata(file_ids: list[int]):
+    pass
+
+
+files.enqueue_metadata = _skip_metadata
@@ -0,0 +1,97 @@
+import asyncio
+from typing import BinaryIO
+
+from app.services.storage import LimitedReader
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class InMemoryStorage:
+    """Stand-in for StorageService that keeps objects in a dict.
+
+    `latency` adds a fixed delay per call to mimic an S3 round trip.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.objects: dict[str, bytes] = {}
+        self.parts: dict[str, dict[int, bytes]] = {}
+        self.calls = 0
+
+    async def _round_trip(self):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def ensure_bucket(self):
+        await self._round_trip()
+
+    async def put_stream(
+        self, object_name: str, raw: BinaryIO, limit: int, content_type: str
+    ) -> int:
+        await self._round_trip()
+        reader = LimitedReader(raw, limit)
+        chunks = []
+        while chunk := reader.read(CHUNK_SIZE):
+            chunks.append(chunk)
+        self.objects[object_name] = b"".join(chunks)
+        return reader.size
+
+    async def presigned_get(
+        self, object_name: str, filename: str | None = None
+    ) -> str:
+        await self._round_trip()
+        return f"http://storage.invalid/{object_name}?sig=bench"
+
+    async def presigned_post(
+        self, object_name: str, content_type: str, size: int
+    ) -> tuple[str, dict[str, str]]:
+        await self._round_trip()
+        return "http://storage.invalid/", {"key": object_name, "sig": "bench"}
+
+    async def stat(self, object_name: str) -> tuple[int, None] | None:
+        await self._round_trip()
+        data = self.objects.get(object_name)
+        return None if data is None else (len(data), None)
+
+    async def remove(self, object_name: str):
+        await self._round_trip()
+        self.objects.pop(object_name, None)
+
+    async def create_multipart(self, object_name: str, content_type: str) -> str:
+        await self._round_trip()
+        self.parts[object_name] = {}
+        return object_name
+
+    async def upload_part(
+        self, object_name: str, upload_id: str, part_number: int, data: bytes
+    ) -> str:
+        await self._round_trip()
+        self.parts[upload_id][part_number] = data
+        return str(part_number)
+
+    async def complete_multipart(
+        self, object_name: str, upload_id: str, etags: list[str]
+    ):
+        await self._round_trip()
+        parts = self.parts.pop(upload_id)
+        self.objects[object_name] = b"".join(
+            parts[n] for n in range(1, len(etags) + 1)
+        )
+
+    async def abort_multipart(self, object_name: str, upload_id: str):
+        await self._round_trip()
+        self.parts.pop(upload_id, None)
+
+    def local_path(self, object_name: str) -> None:
+        return None
+
+    def download_to(self, object_name: str, path: str):
+        with open(path, "wb") as out:
+            out.write(self.objects[object_name])
+
+    def stats(self) -> dict:
+        return {"workers": 0, "active": 0, "queued": 0}
+
+    def close(self):
+        pass
@@ -0,0 +1,219 @@
+"""Load-test the API against local stand-ins and compare with a baseline.
+
+In-process (default) the ASGI app is driven through httpx. To measure a
+real server, seed with --seed-only, start `uvicorn bench.app:app` with the
+same DB_URL and run again with --url.
+
+    pip install -r bench/requirements.txt
+    python -m bench.harness --files 100000 --save-baseline
+    python -m bench.harness --files 100000        # fails on regression
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import bench.app  # noqa: F401  (must come before other app imports)
+import httpx
+from app.core.security import create_access_token
+from app.services.hashing import hasher
+from bench.seed import PASSWORD, load, seed
+
+BASELINE = Path(__file__).with_name("baseline.json")
+
+
+@dataclass
+class Result:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def summary(self) -> dict:
+        lat = sorted(self.latencies) or [0.0]
+        q = statistics.quantiles(lat, n=100) if len(lat) > 1 else lat * 99
+        return {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "rps": round(len(self.latencies) / self.elapsed, 1)
+            if self.elapsed
+            else 0.0,
+            "p50_ms": round(q[49] * 1000, 2),
+            "p95_ms": round(q[94] * 1000, 2),
+            "p99_ms": round(q[98] * 1000, 2),
+        }
+
+
+def pdf_bytes(rnd: random.Random, duplicate: bool) -> bytes:
+    body = b"shared" if duplicate else rnd.randbytes(32 * 1024)
+    return b"%PDF-1.4\n" + body + b"\n%%EOF\n"
+
+
+def build_scenarios(users: list[dict], public_ids: list[int], n_files: int):
+    rnd = random.Random(7)
+    plain = [u for u in users if u["role"].value == "USER"]
+    tokens = {
+        u["username"]: create_access_token(
+            {"sub": u["username"], "role": u["role"].value}
+        )
+        for u in plain[:200] + [users[0]]
+    }
+
+    def auth(username: str) -> dict:
+        return {"Authorization": f"Bearer {tokens[username]}"}
+
+    some_user = lambda: rnd.choice(plain[:200])["username"]  # noqa: E731
+    popular = public_ids[:10] or [1]
+
+    return {
+        "login_storm": lambda c: c.post(
+            "/auth/login",
+            data={"username": some_user(), "password": PASSWORD},
+        ),
+        "list_files_user": lambda c: c.get(
+            "/files/", params={"limit": 100}, headers=auth(some_user())
+        ),
+        "list_files_admin": lambda c: c.get(
+            "/files/",
+            params={"limit": 100, "cursor": rnd.randint(0, n_files)},
+            headers=auth("admin"),
+        ),
+        "get_file": lambda c: c.get(
+            f"/files/{rnd.choice(popular)}", headers=auth(some_user())
+        ),
+        "download_burst": lambda c: c.get(
+            f"/files/{rnd.choice(popular)}/download", headers=auth(some_user())
+        ),
+        "upload_mix": lambda c: c.post(
+            "/files/upload",
+            files={
+                "uploaded": (
+                    "bench.pdf",
+                    pdf_bytes(rnd, duplicate=rnd.random() < 0.5),
+                    "application/pdf",
+                )
+            },
+            headers=auth(some_user()),
+        ),
+    }
+
+
+async def run_scenario(client, call, total: int, concurrency: int) -> Result:
+    result = Result()
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                response = await call(client)
+                if response.status_code >= 400:
+                    result.errors += 1
+            except httpx.HTTPError:
+                result.errors += 1
+            result.latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, now in current.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if now["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {before['p95_ms']}ms -> {now['p95_ms']}ms"
+            )
+        if now["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {before['rps']} -> {now['rps']}")
+    return regressions
+
+
+def print_table(results: dict, baseline: dict):
+    print(
+        f"{'scenario':18} {'req':>6} {'err':>5} {'rps':>8} "
+        f"{'p50':>8} {'p95':>8} {'p99':>8} {'p95 base':>9}"
+    )
+    for name, r in results.items():
+        base = baseline.get(name, {}).get("p95_ms", "-")
+        print(
+            f"{name:18} {r['requests']:6} {r['errors']:5} {r['rps']:8} "
+            f"{r['p50_ms']:8} {r['p95_ms']:8} {r['p99_ms']:8} {base:>9}"
+        )
+
+
+async def main(args) -> int:
+    if args.url and not args.seed_only:
+        # the server owns the database; it was seeded with --seed-only
+        users, public_ids = await load()
+    else:
+        users, public_ids = await seed(
+            args.users, args.departments, args.files, random.Random(42)
+        )
+    if args.seed_only:
+        return 0
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+    else:
+        transport = httpx.ASGITransport(app=bench.app.app)
+        client = httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=60
+        )
+
+    scenarios = build_scenarios(users, public_ids, args.files)
+    selected = args.scenario or list(scenarios)
+    results = {}
+    async with client:
+        for name in selected:
+            r = await run_scenario(
+                client, scenarios[name], args.requests, args.concurrency
+            )
+            results[name] = r.summary()
+    hasher.close()
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    print_table(results, baseline)
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--users", type=int, default=2_000)
+    p.add_argument("--departments", type=int, default=20)
+    p.add_argument("--files", type=int, default=50_000)
+    p.add_argument("--requests", type=int, default=500, help="per scenario")
+    p.add_argument("--concurrency", type=int, default=32)
+    p.add_argument("--scenario", action="append", help="run only these")
+    p.add_argument("--url", help="drive a running server instead")
+    p.add_argument("--seed-only", action="store_true")
+    p.add_argument("--baseline", type=Path, default=BASELINE)
+    p.add_argument("--save-baseline", action="store_true")
+    p.add_argument(
+        "--tolerance",
+        type=float,
+        default=float(os.environ.get("BENCH_TOLERANCE", "0.2")),
+        help="allowed relative slowdown before failing",
+    )
+    return p.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
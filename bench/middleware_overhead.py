@@ -0,0 +1,129 @@
+"""Per-request overhead of the request-logging middleware.
+
+Compares a bare app, the previous BaseHTTPMiddleware-style `log_requests`
+(synchronous logging) and RequestLogMiddleware (queued logging), calling
+the ASGI app directly so no server or network time is included:
+
+    python -m bench.middleware_overhead [requests]
+"""
+import asyncio
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.core.metrics import observe_request, start_request
+from app.middleware import RequestLogMiddleware
+
+SCOPE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "path": "/ping",
+    "raw_path": b"/ping",
+    "query_string": b"",
+    "root_path": "",
+    "headers": [],
+    "client": ("127.0.0.1", 50000),
+    "server": ("bench", 80),
+}
+
+devnull = open(os.devnull, "w")
+legacy_logger = logging.getLogger("bench.legacy")
+legacy_logger.addHandler(logging.StreamHandler(devnull))
+legacy_logger.propagate = False
+legacy_logger.setLevel(logging.INFO)
+
+
+async def legacy_log_requests(request, call_next):
+    # the pre-ASGI middleware plus the same metrics work
+    stats = start_request()
+    start_time = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start_time
+    route = request.scope.get("route")
+    observe_request(
+        request.method,
+        route.path if route else "unmatched",
+        response.status_code,
+        elapsed,
+        stats,
+    )
+    legacy_logger.info(
+        f"{request.method} {request.url.path} "
+        f"status={response.status_code} "
+        f"time={elapsed * 1000:.2f}ms"
+    )
+    return response
+
+
+async def ping(request):
+    return PlainTextResponse("pong")
+
+
+def build(variant: str):
+    app = Starlette(routes=[Route("/ping", ping)])
+    if variant == "legacy":
+        app.add_middleware(BaseHTTPMiddleware, dispatch=legacy_log_requests)
+    elif variant == "asgi":
+        app.add_middleware(RequestLogMiddleware, sample_rate=1.0)
+    return app
+
+
+async def drive(app, n: int) -> float:
+    async def receive():
+        if not sent_body:
+            sent_body.append(True)
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # like a server: block until the client goes away
+        await asyncio.Event().wait()
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(n):
+        sent_body: list = []
+        await app(dict(SCOPE), receive, send)
+    return (time.perf_counter() - start) / n
+
+
+async def main(n: int):
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(
+        records, logging.StreamHandler(devnull)
+    )
+    app_logger = logging.getLogger("app")
+    app_logger.handlers = [logging.handlers.QueueHandler(records)]
+    app_logger.propagate = False
+    app_logger.setLevel(logging.INFO)
+    listener.start()
+
+    results = {}
+    for variant in ("bare", "legacy", "asgi"):
+        app = build(variant)
+        await drive(app, min(n, 500))  # warm-up
+        results[variant] = await drive(app, n)
+    listener.stop()
+
+    bare = results["bare"]
+    print(f"{'variant':8} {'us/req':>9} {'overhead':>10}")
+    for variant, per_req in results.items():
+        print(
+            f"{variant:8} {per_req * 1e6:9.1f} {(per_req - bare) * 1e6:9.1f}us"
+        )
+    saved = (results["legacy"] - results["asgi"]) * 1e6
+    print(f"ASGI middleware saves {saved:.1f}us per request")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000))
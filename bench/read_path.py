@@ -0,0 +1,94 @@
+"""Rows/sec of the file listing read path, ORM vs projected rows.
+
+Walks a whole seeded table in keyset pages of PAGE_SIZE_MAX, the way
+/files/ is paged, and compares:
+
+    orm      SELECT the File entity, validate through FileRead and dump
+             the JSON (what FastAPI does with a response_model)
+    columns  SELECT only the FileRead columns as plain rows and encode
+             them with orjson (the current list_files)
+
+    python -m bench.read_path --files 100000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import bench.app  # noqa: F401  (must come before other app imports)
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import select
+
+from app.config import settings
+from app.db import async_session_maker, columns_for
+from app.models import File
+from app.schemas.files import FileRead
+from bench.seed import seed
+
+PAGE = settings.PAGE_SIZE_MAX
+FILE_PAGE = TypeAdapter(list[FileRead])
+COLUMNS = columns_for(File, FileRead)
+
+
+async def orm_page(session, cursor: int) -> tuple[int, int, int]:
+    res = await session.execute(
+        select(File).where(File.id > cursor).order_by(File.id).limit(PAGE)
+    )
+    files = res.scalars().all()
+    body = FILE_PAGE.dump_json(FILE_PAGE.validate_python(files))
+    # the identity map would otherwise grow over the whole walk
+    session.expunge_all()
+    return len(files), files[-1].id if files else cursor, len(body)
+
+
+async def columns_page(session, cursor: int) -> tuple[int, int, int]:
+    res = await session.execute(
+        select(*COLUMNS).where(File.id > cursor).order_by(File.id).limit(PAGE)
+    )
+    rows = [row._asdict() for row in res.all()]
+    body = orjson.dumps(rows)
+    return len(rows), rows[-1]["id"] if rows else cursor, len(body)
+
+
+async def walk(read_page) -> tuple[int, float]:
+    total, cursor = 0, 0
+    start = time.perf_counter()
+    async with async_session_maker() as session:
+        while True:
+            n, cursor, _ = await read_page(session, cursor)
+            total += n
+            if n < PAGE:
+                break
+    return total, time.perf_counter() - start
+
+
+async def main(args):
+    if not args.reuse:
+        await seed(args.users, args.departments, args.files, random.Random(42))
+    paths = {"orm": orm_page, "columns": columns_page}
+    best: dict[str, float] = {}
+    for _ in range(args.rounds):
+        for name, read_page in paths.items():
+            rows, elapsed = await walk(read_page)
+            best[name] = max(best.get(name, 0.0), rows / elapsed)
+    print(f"{rows} rows in pages of {PAGE}, best of {args.rounds}")
+    for name, rate in best.items():
+        print(f"{name:8} {rate:12,.0f} rows/s")
+    print(f"speedup  {best['columns'] / best['orm']:12.2f}x")
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--files", type=int, default=100_000)
+    p.add_argument("--users", type=int, default=2_000)
+    p.add_argument("--departments", type=int, default=20)
+    p.add_argument("--rounds", type=int, default=3)
+    p.add_argument(
+        "--reuse", action="store_true", help="keep the already seeded data"
+    )
+    return p.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,104 @@
+import random
+
+from sqlalchemy import insert, select
+
+from app.db import Base, engine
+from app.models import Department, File, Role, User, Visibility
+from app.services.hashing import pwd_context
+
+PASSWORD = "benchpass"
+CHUNK = 5_000
+
+
+async def seed(users: int, departments: int, files: int, rnd: random.Random):
+    """Recreate the schema and fill it with realistic volumes.
+
+    Users are `user0..N` (about 90% USER, 8% MANAGER, 2% ADMIN) plus
+    `admin`; all share one password hash so seeding skips bcrypt. File
+    visibility is roughly 60% PRIVATE, 25% DEPARTMENT, 15% PUBLIC.
+    """
+    password_hash = pwd_context.hash(PASSWORD)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+        await conn.execute(
+            insert(Department),
+            [{"id": d, "name": f"dept{d}"} for d in range(1, departments + 1)],
+        )
+
+        user_rows = [
+            {
+                "id": 1,
+                "username": "admin",
+                "password_hash": password_hash,
+                "role": Role.ADMIN,
+                "department_id": 1,
+            }
+        ]
+        for i in range(users):
+            role = rnd.choices(
+                [Role.USER, Role.MANAGER, Role.ADMIN], weights=[90, 8, 2]
+            )[0]
+            user_rows.append(
+                {
+                    "id": i + 2,
+                    "username": f"user{i}",
+                    "password_hash": password_hash,
+                    "role": role,
+                    "department_id": rnd.randint(1, departments),
+                }
+            )
+        for start in range(0, len(user_rows), CHUNK):
+            await conn.execute(insert(User), user_rows[start : start + CHUNK])
+
+        batch = []
+        public_ids = []
+        for i in range(1, files + 1):
+            owner = rnd.choice(user_rows)
+            visibility = rnd.choices(list(Visibility), weights=[60, 25, 15])[0]
+            if visibility == Visibility.PUBLIC:
+                public_ids.append(i)
+            batch.append(
+                {
+                    "id": i,
+                    "filename": f"doc{i}.pdf",
+                    "storage_key": f"seed/{i}",
+                    "size": rnd.randint(10_000, 5_000_000),
+                    "mime_type": "application/pdf",
+                    "visibility": visibility,
+                    "owner_id": owner["id"],
+                    "department_id": owner["department_id"],
+                    "meta": {},
+                    "download_count": 0,
+                }
+            )
+            if len(batch) == CHUNK:
+                await conn.execute(insert(File), batch)
+                batch = []
+        if batch:
+            await conn.execute(insert(File), batch)
+    return user_rows, public_ids
+
+
+async def load() -> tuple[list[dict], list[int]]:
+    """Read back what `seed` wrote, for runs against a running server."""
+    async with engine.connect() as conn:
+        users = [
+            dict(row._mapping)
+            for row in await conn.execute(
+                select(User.id, User.username, User.role, User.department_id)
+                .order_by(User.id)
+            )
+        ]
+        public_ids = list(
+            (
+                await conn.execute(
+                    select(File.id)
+                    .where(File.visibility == Visibility.PUBLIC)
+                    .order_by(File.id)
+                    .limit(100)
+                )
+            ).scalars()
+        )
+    return users, public_ids
@@ -0,0 +1,85 @@
+"""Check that the hot file-access queries are served by indexes.
+
+Run against a migrated database (`alembic upgrade head`):
+
+    python -m scripts.check_query_plans
+
+Sequential scans are disabled for the session so the check answers "can
+the planner use an index for this predicate" even on a near-empty dev
+database, where a seq scan would otherwise always win.
+"""
+import json
+import sys
+
+from sqlalchemy import create_engine, exists, select, text
+from sqlalchemy.dialects import postgresql
+
+from app.config import settings
+from app.core.pagination import PageParams
+from app.models import File, Role, User
+from app.routers.files import list_files_query
+from app.services.principals import Principal
+from app.services.search import filename_clause
+from app.tasks import sync_url
+
+USER = Principal(id=1, username="probe", role=Role.USER, department_id=1)
+ADMIN = Principal(id=2, username="probe-admin", role=Role.ADMIN, department_id=1)
+FIRST_PAGE = PageParams(cursor=None, limit=settings.PAGE_SIZE_DEFAULT, stream=False)
+
+HOT_QUERIES = {
+    # exactly what the route runs: status filter, ORDER BY id and LIMIT
+    # included, as they can change the index the planner picks
+    "list_files (USER)": (
+        list_files_query(USER, [], FIRST_PAGE),
+        {
+            "ix_files_public_id",
+            "ix_files_department_visible_id",
+            "ix_files_owner_id_id",
+        },
+    ),
+    "list_files (owner filter)": (
+        list_files_query(ADMIN, [File.owner_id == 1], FIRST_PAGE),
+        {"ix_files_owner_id_id"},
+    ),
+    "search_files (filename substring)": (
+        select(File).where(filename_clause("report", "substring")),
+        {"ix_files_filename_trgm"},
+    ),
+    "delete_department (members)": (
+        select(exists().where(User.department_id == 1)),
+        {"ix_users_department_id"},
+    ),
+}
+
+
+def index_names(plan: dict) -> set[str]:
+    names = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        names |= index_names(child)
+    return names
+
+
+def main() -> int:
+    engine = create_engine(sync_url(settings.DATABASE_URL))
+    failed = False
+    with engine.connect() as conn:
+        conn.execute(text("SET enable_seqscan = off"))
+        for name, (stmt, expected) in HOT_QUERIES.items():
+            sql = stmt.compile(
+                dialect=postgresql.dialect(),
+                compile_kwargs={"literal_binds": True},
+            )
+            raw = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+            plan = (raw if isinstance(raw, list) else json.loads(raw))[0]
+            used = index_names(plan["Plan"])
+            missing = expected - used
+            status = "FAIL" if missing else "ok"
+            failed = failed or bool(missing)
+            print(f"{status:4} {name}: uses {sorted(used) or 'no index'}")
+            if missing:
+                print(f"     missing {sorted(missing)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
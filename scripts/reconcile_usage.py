@@ -0,0 +1,22 @@
+"""Rebuild the user and department usage counters from `files`.
+
+The counters are maintained by every upload, delete and download flush;
+run this after manual changes to `files` or if they look wrong:
+
+    python -m scripts.reconcile_usage
+"""
+import asyncio
+
+from app.db import async_session_maker
+from app.services.usage import reconcile_usage
+
+
+async def main():
+    async with async_session_maker() as session:
+        drift = await reconcile_usage(session)
+    for table, wrong in drift.items():
+        print(f"{table}: {wrong} rows corrected")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
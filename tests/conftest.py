@@ -0,0 +1,71 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+# settings are read at import time, so this runs before the app is imported
+_tmp = tempfile.mkdtemp(prefix="file-api-tests-")
+os.environ.update(
+    DB_URL=f"sqlite+aiosqlite:///{_tmp}/test.db",
+    STORAGE_BACKEND="local",
+    LOCAL_STORAGE_ROOT=f"{_tmp}/storage",
+    UPLOAD_PART_SIZE="5",
+    BCRYPT_ROUNDS="4",
+    LOG_SAMPLE_RATE="0",
+    RATE_LIMIT_ENABLED="false",
+)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.db import Base, async_session_maker, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Department, Role, User  # noqa: E402
+from app.routers import files  # noqa: E402
+from app.services.hashing import pwd_context  # noqa: E402
+
+USERS = {"admin": Role.ADMIN, "user": Role.USER}
+
+
+async def _create_db():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_session_maker() as session:
+        session.add(Department(id=1, name="Engineering"))
+        for i, (username, role) in enumerate(USERS.items(), 1):
+            session.add(
+                User(
+                    id=i,
+                    username=username,
+                    password_hash=pwd_context.hash("password"),
+                    role=role,
+                    department_id=1,
+                )
+            )
+        await session.commit()
+
+
+@pytest.fixture(scope="session")
+def client():
+    asyncio.run(_create_db())
+
+    # no broker here; files just stay PENDING
+    async def enqueue_metadata(file_ids: list[int]):
+        pass
+
+    files.enqueue_metadata = enqueue_metadata
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def auth(client):
+    """Authorization headers by username."""
+    headers = {}
+    for username in USERS:
+        r = client.post(
+            "/auth/login", data={"username": username, "password": "password"}
+        )
+        assert r.status_code == 200, r.text
+        headers[username] = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    return headers
@@ -0,0 +1,43 @@
+import io
+import zipfile
+
+from app.config import settings
+
+
+def make_zip(members: dict[str, bytes]) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def upload_zip(client, headers, archive: bytes):
+    return client.post(
+        "/files/upload/batch",
+        headers=headers,
+        files=[("uploaded", ("docs.zip", archive, "application/zip"))],
+        data={"explode_zip": "true"},
+    )
+
+
+def test_zip_members_become_files(client, auth):
+    archive = make_zip({"a.txt": b"first", "b.txt": b"second"})
+    r = upload_zip(client, auth["admin"], archive)
+    assert r.status_code == 200, r.text
+    assert [(i["filename"], i["ok"]) for i in r.json()] == [
+        ("a.txt", True),
+        ("b.txt", True),
+    ]
+
+
+def test_zip_unpacking_past_batch_budget_is_rejected(client, auth, monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_MAX_UNZIPPED_BYTES", 1000)
+    # compresses to a few hundred bytes, each member within the role limit
+    archive = make_zip({f"{i}.txt": bytes(600) for i in range(3)})
+    r = upload_zip(client, auth["admin"], archive)
+    assert r.status_code == 200, r.text
+    [item] = r.json()
+    assert not item["ok"]
+    assert item["status_code"] == 400
+    assert "more than 1000 bytes" in item["error"]
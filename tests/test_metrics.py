@@ -0,0 +1,7 @@
+def test_routes_are_labelled_with_their_full_template(client, auth):
+    client.get("/auth/me", headers=auth["user"])
+    client.get("/files/12345", headers=auth["user"])
+    body = client.get("/metrics").text
+    assert 'method="GET",route="/auth/me",status="200"' in body
+    assert 'method="GET",route="/files/{file_id}",status="404"' in body
+    assert 'route="/me"' not in body
@@ -0,0 +1,66 @@
+"""The Python and SQL forms of the file access policy agree.
+
+Every combination of visibility, owner and department is stored in an
+in-memory SQLite database; for every combination of role, user and
+department the files `can_view` / `can_delete` allow must be exactly the
+rows `view_clause` / `delete_clause` select.
+"""
+import itertools
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+
+from app.core.policy import can_delete, can_view, delete_clause, view_clause
+from app.db import Base
+from app.models import File, ProcessingStatus, Role, Visibility
+from app.services.principals import Principal
+
+USER_IDS = (1, 2)
+OWNER_IDS = (1, 2, 3)
+DEPARTMENTS = (None, 1, 2)
+
+RULES = {
+    "view": (can_view, view_clause),
+    "delete": (can_delete, delete_clause),
+}
+
+FILE_ROWS = [
+    {
+        "id": n,
+        "filename": f"f{n}",
+        "storage_key": f"f{n}",
+        "size": 1,
+        "mime_type": "application/pdf",
+        "visibility": vis,
+        "owner_id": owner,
+        "department_id": dept,
+        "processing_status": ProcessingStatus.DONE,
+    }
+    for n, (vis, owner, dept) in enumerate(
+        itertools.product(Visibility, OWNER_IDS, DEPARTMENTS), start=1
+    )
+]
+
+
+@pytest.fixture(scope="module")
+def conn():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(File), FILE_ROWS)
+        yield conn
+    engine.dispose()
+
+
+@pytest.mark.parametrize("rule", RULES)
+@pytest.mark.parametrize("department_id", DEPARTMENTS)
+@pytest.mark.parametrize("user_id", USER_IDS)
+@pytest.mark.parametrize("role", Role)
+def test_python_and_sql_agree(conn, role, user_id, department_id, rule):
+    user = Principal(
+        id=user_id, username=f"u{user_id}", role=role, department_id=department_id
+    )
+    check, clause = RULES[rule]
+    in_python = {row["id"] for row in FILE_ROWS if check(user, File(**row))}
+    in_sql = set(conn.execute(select(File.id).where(clause(user))).scalars())
+    assert in_python == in_sql
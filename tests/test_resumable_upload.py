@@ -0,0 +1,54 @@
+def start_upload(client, headers, size: int) -> int:
+    r = client.post(
+        "/files/uploads/resumable",
+        headers=headers,
+        json={
+            "filename": "big.bin",
+            "size": size,
+            "content_type": "application/octet-stream",
+        },
+    )
+    assert r.status_code == 201, r.text
+    return r.json()["file_id"]
+
+
+def patch(client, headers, file_id: int, offset: int, data: bytes):
+    return client.patch(
+        f"/files/uploads/{file_id}",
+        headers={**headers, "Upload-Offset": str(offset)},
+        content=data,
+    )
+
+
+def test_chunks_complete_upload(client, auth):
+    file_id = start_upload(client, auth["admin"], 12)
+    for offset, chunk in ((0, b"abcde"), (5, b"fghij"), (10, b"kl")):
+        assert patch(client, auth["admin"], file_id, offset, chunk).status_code == 204
+
+    r = client.post(f"/files/uploads/{file_id}/complete", headers=auth["admin"])
+    assert r.status_code == 200, r.text
+    r = client.get(f"/files/{file_id}/content", headers=auth["admin"])
+    assert r.content == b"abcdefghijkl"
+
+
+def test_empty_chunk_is_rejected(client, auth):
+    file_id = start_upload(client, auth["admin"], 12)
+    r = patch(client, auth["admin"], file_id, 0, b"")
+    assert r.status_code == 400
+    assert r.headers["Upload-Offset"] == "0"
+
+
+def test_chunk_after_last_is_rejected(client, auth):
+    file_id = start_upload(client, auth["admin"], 7)
+    assert patch(client, auth["admin"], file_id, 0, b"abcde").status_code == 204
+    assert patch(client, auth["admin"], file_id, 5, b"fg").status_code == 204
+
+    r = patch(client, auth["admin"], file_id, 7, b"")
+    assert r.status_code == 409
+    assert r.headers["Upload-Offset"] == "7"
+
+    # the upload is untouched and still completes
+    r = client.post(f"/files/uploads/{file_id}/complete", headers=auth["admin"])
+    assert r.status_code == 200, r.text
+    r = client.get(f"/files/{file_id}/content", headers=auth["admin"])
+    assert r.content == b"abcdefg"
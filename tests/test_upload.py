@@ -0,0 +1,19 @@
+def upload(client, headers, content: bytes, **data):
+    return client.post(
+        "/files/upload",
+        headers=headers,
+        files={"uploaded": ("notes.txt", content, "text/plain")},
+        data=data,
+    )
+
+
+def test_visibility_is_a_form_field(client, auth):
+    r = upload(client, auth["admin"], b"shared notes", visibility="PUBLIC")
+    assert r.status_code == 201, r.text
+    assert r.json()["visibility"] == "PUBLIC"
+
+
+def test_visibility_defaults_to_private(client, auth):
+    r = upload(client, auth["admin"], b"my notes")
+    assert r.status_code == 201, r.text
+    assert r.json()["visibility"] == "PRIVATE"